@@ -1,17 +1,34 @@
 from typing import List, Optional
+import asyncio
 from datetime import date, datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from app.db.database import get_db
-from app.middleware.auth import get_current_admin_user
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, select
+from app.db.database import ReadSessionLocal, get_async_db, get_read_db
+from app.api.v1.pagination import fetch_page
+from app.core.cache import SnapshotCache
+from app.core.config import settings
+from app.middleware.auth import (
+    get_current_admin_user, invalidate_user, principal_cache, principal_cache_sync
+)
+from app.middleware.rate_limit import rate_limiter
+from app.services.access_log_writer import access_log_writer
+from app.services.completion_cache import completion_cache
+from app.services.log_archiver import log_archiver
+from app.services.load_balancer import load_balancer
+from app.services.model_registry import model_registry
+from app.services.single_flight import single_flight
+from app.services.upstream_clients import upstream_clients
 from app.crud.user import user
 from app.crud.model import model
 from app.crud.api_key import api_key
 from app.crud.access_log import access_log
+from app.crud.usage_stat import usage_stat
 from app.schemas.user import User, UserCreate, UserUpdate
 from app.schemas.model import Model, ModelCreate, ModelUpdate
 from app.models.user import User as UserModel
+from app.models.model import Model as ModelModel
 from app.models.access_log import AccessLog
 
 router = APIRouter()
@@ -19,54 +36,59 @@ router = APIRouter()
 # User Management
 @router.get("/users", response_model=List[User])
 async def list_all_users(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_admin: UserModel = Depends(get_current_admin_user),
-    skip: int = 0,
-    limit: int = 100
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=1000)
 ):
     """List all users (admin only)"""
-    users = user.get_multi(db, skip=skip, limit=limit)
-    return users
+    if skip:
+        # Offset paging for older clients, cost grows with skip
+        return await user.get_multi_async(db, skip=skip, limit=limit)
+    return await fetch_page(user, db, response, cursor=cursor, limit=limit)
 
 @router.post("/users", response_model=User)
 async def create_user(
     user_in: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: UserModel = Depends(get_current_admin_user)
 ):
     """Create a new user (admin only)"""
     # Check if user already exists
-    if user.get_by_username(db, username=user_in.username):
+    if await user.get_by_username_async(db, username=user_in.username):
         raise HTTPException(status_code=400, detail="Username already exists")
-    if user.get_by_email(db, email=user_in.email):
+    if await user.get_by_email_async(db, email=user_in.email):
         raise HTTPException(status_code=400, detail="Email already exists")
     
-    new_user = user.create(db, obj_in=user_in)
+    new_user = await user.create_async(db, obj_in=user_in)
     return new_user
 
 @router.put("/users/{user_id}", response_model=User)
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: UserModel = Depends(get_current_admin_user)
 ):
     """Update a user (admin only)"""
-    db_user = user.get(db, id=user_id)
+    db_user = await user.get_async(db, id=user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    updated_user = user.update(db, db_obj=db_user, obj_in=user_update)
+    updated_user = await user.update_async(db, db_obj=db_user, obj_in=user_update)
+    await invalidate_user(db, user_id)
     return updated_user
 
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: UserModel = Depends(get_current_admin_user)
 ):
     """Delete a user (admin only)"""
-    db_user = user.get(db, id=user_id)
+    db_user = await user.get_async(db, id=user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -74,101 +96,120 @@ async def delete_user(
     if db_user.id == current_admin.id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
-    user.remove(db, id=user_id)
+    await user.remove_async(db, id=user_id)
+    await invalidate_user(db, user_id)
     return {"message": "User deleted successfully"}
 
 # Model Management
 @router.get("/models", response_model=List[Model])
 async def list_all_models(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_admin: UserModel = Depends(get_current_admin_user),
-    skip: int = 0,
-    limit: int = 100
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=1000)
 ):
     """List all models (admin only)"""
-    models = model.get_multi(db, skip=skip, limit=limit)
-    return models
+    if skip:
+        # Offset paging for older clients, cost grows with skip
+        return await model.get_multi_async(db, skip=skip, limit=limit)
+    return await fetch_page(model, db, response, cursor=cursor, limit=limit)
 
 @router.post("/models", response_model=Model)
 async def create_model(
     model_in: ModelCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: UserModel = Depends(get_current_admin_user)
 ):
     """Create a new model (admin only)"""
     # Check if model name already exists
-    if model.get_by_name(db, name=model_in.name):
+    if await model.get_by_name_async(db, name=model_in.name):
         raise HTTPException(status_code=400, detail="Model name already exists")
     
-    new_model = model.create(db, obj_in=model_in)
+    new_model = await model.create_async(db, obj_in=model_in)
+    await model_registry.bump(db)
     return new_model
 
 @router.put("/models/{model_id}", response_model=Model)
 async def update_model(
     model_id: int,
     model_update: ModelUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: UserModel = Depends(get_current_admin_user)
 ):
     """Update a model (admin only)"""
-    db_model = model.get(db, id=model_id)
+    db_model = await model.get_async(db, id=model_id)
     if not db_model:
         raise HTTPException(status_code=404, detail="Model not found")
     
-    updated_model = model.update(db, db_obj=db_model, obj_in=model_update)
+    updated_model = await model.update_async(db, db_obj=db_model, obj_in=model_update)
+    await model_registry.bump(db)
     return updated_model
 
 @router.delete("/models/{model_id}")
 async def delete_model(
     model_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: UserModel = Depends(get_current_admin_user)
 ):
     """Delete a model (admin only)"""
-    db_model = model.get(db, id=model_id)
+    db_model = await model.get_async(db, id=model_id)
     if not db_model:
         raise HTTPException(status_code=404, detail="Model not found")
     
-    model.remove(db, id=model_id)
+    await model.remove_async(db, id=model_id)
+    await model_registry.bump(db)
     return {"message": "Model deleted successfully"}
 
 # Statistics and Analytics
-@router.get("/stats/overview")
-async def get_overview_stats(
-    db: Session = Depends(get_db),
-    current_admin: UserModel = Depends(get_current_admin_user)
-):
-    """Get platform overview statistics"""
-    # Get counts
-    total_users = db.query(func.count(UserModel.id)).scalar()
-    active_users = db.query(func.count(UserModel.id)).filter(UserModel.is_active == True).scalar()
-    total_models = db.query(func.count(Model.id)).scalar()
-    active_models = db.query(func.count(Model.id)).filter(Model.is_active == True).scalar()
-    
-    # Get recent API calls (last 24 hours)
+# Overview snapshot shared by all admin dashboards polling this process
+overview_cache = SnapshotCache(
+    ttl=settings.STATS_OVERVIEW_TTL_SECONDS,
+    max_stale=settings.STATS_OVERVIEW_MAX_STALE_SECONDS
+)
+
+async def _load_overview_stats() -> dict:
+    """Compute every overview figure in one round trip"""
     yesterday = datetime.utcnow() - timedelta(days=1)
-    recent_calls = db.query(func.count(AccessLog.id)).filter(
-        AccessLog.created_at >= yesterday
-    ).scalar()
+    users = select(
+        func.count(UserModel.id).label("total"),
+        func.count(case((UserModel.is_active == True, 1))).label("active")
+    ).subquery()
+    models = select(
+        func.count(ModelModel.id).label("total"),
+        func.count(case((ModelModel.is_active == True, 1))).label("active")
+    ).subquery()
+    # Both log figures come from one range scan of the last 24 hours
+    logs = select(
+        func.count(AccessLog.id).label("calls"),
+        func.avg(case((AccessLog.status_code == 200, AccessLog.latency_ms))).label("avg_latency")
+    ).filter(AccessLog.created_at >= yesterday).subquery()
     
-    # Get average latency (last 24 hours)
-    avg_latency = db.query(func.avg(AccessLog.latency_ms)).filter(
-        AccessLog.created_at >= yesterday,
-        AccessLog.status_code == 200
-    ).scalar()
+    # Refreshes can outlive the request that triggered them, so open a separate session
+    async with ReadSessionLocal() as db:
+        row = (await db.execute(select(users, models, logs))).one()
     
     return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "total_models": total_models,
-        "active_models": active_models,
-        "recent_api_calls_24h": recent_calls,
-        "avg_latency_ms": float(avg_latency) if avg_latency else 0
+        "total_users": row[0],
+        "active_users": row[1],
+        "total_models": row[2],
+        "active_models": row[3],
+        "recent_api_calls_24h": row[4],
+        "avg_latency_ms": float(row[5]) if row[5] else 0,
+        "generated_at": datetime.utcnow()
     }
 
+@router.get("/stats/overview")
+async def get_overview_stats(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """Get platform overview statistics (cached snapshot)"""
+    return await overview_cache.get(_load_overview_stats)
+
 @router.get("/stats/usage")
 async def get_usage_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_admin: UserModel = Depends(get_current_admin_user),
     days: int = Query(7, ge=1, le=30)
 ):
@@ -176,7 +217,7 @@ async def get_usage_stats(
     start_date = date.today() - timedelta(days=days)
     end_date = date.today()
     
-    stats = access_log.get_stats_by_date(db, start_date=start_date, end_date=end_date)
+    stats = await usage_stat.get_daily_async(db, start_date=start_date, end_date=end_date)
     
     return {
         "period_days": days,
@@ -187,25 +228,65 @@ async def get_usage_stats(
                 "date": stat.date,
                 "request_count": stat.request_count,
                 "total_tokens": stat.total_tokens or 0,
-                "avg_latency_ms": float(stat.avg_latency) if stat.avg_latency else 0
+                "avg_latency_ms": (
+                    stat.total_latency_ms / stat.request_count if stat.request_count else 0
+                )
             }
             for stat in stats
         ]
     }
 
+@router.get("/stats/cache")
+async def get_cache_stats(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """Get in-process cache hit/miss counters"""
+    return {
+        "auth": {**principal_cache.stats(), "sync": principal_cache_sync.stats()},
+        "overview": overview_cache.stats(),
+        "model_registry": model_registry.stats(),
+        "completion": completion_cache.stats() if completion_cache else None,
+        "single_flight": single_flight.stats() if single_flight else None
+    }
+
+@router.get("/stats/rate-limit")
+async def get_rate_limit_stats(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """Get rate limiter state size and eviction counters"""
+    return rate_limiter.stats()
+
+@router.get("/stats/access-log")
+async def get_access_log_writer_stats(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """Get access log queue depth and write/drop counters"""
+    return access_log_writer.stats()
+
+@router.get("/stats/upstream")
+async def get_upstream_stats(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """Get per-origin upstream pool utilization, wait time and handshake counters"""
+    return upstream_clients.stats()
+
+@router.get("/stats/load-balancer")
+async def get_load_balancer_stats(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """Get per-deployment outstanding requests, latency and error rate averages"""
+    return load_balancer.stats()
+
 @router.get("/logs/recent")
 async def get_recent_logs(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_admin: UserModel = Depends(get_current_admin_user),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
     limit: int = Query(50, ge=1, le=1000)
 ):
-    """Get recent access logs"""
-    logs = (
-        db.query(AccessLog)
-        .order_by(desc(AccessLog.created_at))
-        .limit(limit)
-        .all()
-    )
+    """Get recent access logs, newest first"""
+    logs = await fetch_page(access_log, db, response, cursor=cursor, limit=limit, descending=True)
     
     return [
         {
@@ -220,4 +301,28 @@ async def get_recent_logs(
             "error_message": log.error_message
         }
         for log in logs
-    ]
\ No newline at end of file
+    ]
+
+@router.get("/logs/archives")
+async def list_log_archives(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """List daily access log archives and the retention state"""
+    return {
+        **log_archiver.stats(),
+        "archives": await asyncio.to_thread(log_archiver.list_archives)
+    }
+
+@router.get("/logs/archive")
+async def stream_log_archive(
+    start_date: date,
+    end_date: date,
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """Stream archived access logs for a date range as NDJSON"""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    return StreamingResponse(
+        log_archiver.iter_archive(start_date, end_date),
+        media_type="application/x-ndjson"
+    )
@@ -1,73 +1,105 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.middleware.auth import get_current_user
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from app.api.v1.pagination import fetch_page
+from app.middleware.auth import get_current_user, invalidate_api_key
 from app.crud.api_key import api_key
 from app.schemas.api_key import APIKey, APIKeyCreate, APIKeyCreateResponse, APIKeyUpdate
 from app.models.user import User
+from app.models.api_key import APIKey as APIKeyModel
+from app.services.usage_tracker import usage_tracker
 
 router = APIRouter()
 
+def _with_pending_usage(db_api_key) -> APIKey:
+    """Merge usage still buffered in memory into the stored counters"""
+    result = APIKey.model_validate(db_api_key)
+    pending = usage_tracker.get_pending(db_api_key.id)
+    if pending:
+        count, used_at = pending
+        last_used_at = result.last_used_at
+        if last_used_at is None or last_used_at.replace(tzinfo=None) < used_at:
+            last_used_at = used_at
+        result = result.model_copy(update={
+            "usage_count": (result.usage_count or 0) + count,
+            "last_used_at": last_used_at
+        })
+    return result
+
 @router.get("/", response_model=List[APIKey])
 async def list_api_keys(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Page size, all keys are returned when neither cursor nor limit is set"
+    )
 ):
     """List user's API keys"""
-    api_keys = api_key.get_by_user(db, user_id=current_user.id)
-    return api_keys
+    if cursor is None and limit is None:
+        # Unpaged for existing clients, a user only holds a handful of keys
+        api_keys = await api_key.get_by_user_async(db, user_id=current_user.id)
+    else:
+        api_keys = await fetch_page(
+            api_key, db, response, cursor=cursor, limit=limit or 100,
+            where=[APIKeyModel.user_id == current_user.id]
+        )
+    return [_with_pending_usage(k) for k in api_keys]
 
 @router.post("/", response_model=APIKeyCreateResponse)
 async def create_api_key(
     api_key_in: APIKeyCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new API key"""
-    db_api_key, key = api_key.create(db, obj_in=api_key_in, user_id=current_user.id)
+    db_api_key, key = await api_key.create_async(db, obj_in=api_key_in, user_id=current_user.id)
     return APIKeyCreateResponse(api_key=db_api_key, key=key)
 
 @router.put("/{api_key_id}", response_model=APIKey)
 async def update_api_key(
     api_key_id: int,
     api_key_update: APIKeyUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update an API key"""
-    db_api_key = api_key.get(db, id=api_key_id)
+    db_api_key = await api_key.get_async(db, id=api_key_id)
     if not db_api_key:
         raise HTTPException(status_code=404, detail="API key not found")
     
     if db_api_key.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    updated_api_key = api_key.update(db, db_obj=db_api_key, obj_in=api_key_update)
-    return updated_api_key
+    updated_api_key = await api_key.update_async(db, db_obj=db_api_key, obj_in=api_key_update)
+    await invalidate_api_key(db, api_key_id)
+    return _with_pending_usage(updated_api_key)
 
 @router.delete("/{api_key_id}")
 async def delete_api_key(
     api_key_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Delete an API key"""
-    db_api_key = api_key.get(db, id=api_key_id)
+    db_api_key = await api_key.get_async(db, id=api_key_id)
     if not db_api_key:
         raise HTTPException(status_code=404, detail="API key not found")
     
     if db_api_key.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    api_key.remove(db, id=api_key_id)
+    await api_key.remove_async(db, id=api_key_id)
+    await invalidate_api_key(db, api_key_id)
     return {"message": "API key deleted successfully"}
 
 @router.get("/active", response_model=List[APIKey])
 async def list_active_api_keys(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """List user's active API keys"""
-    api_keys = api_key.get_active_keys(db, user_id=current_user.id)
-    return api_keys
\ No newline at end of file
+    api_keys = await api_key.get_active_keys_async(db, user_id=current_user.id)
+    return [_with_pending_usage(k) for k in api_keys]
\ No newline at end of file
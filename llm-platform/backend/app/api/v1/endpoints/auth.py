@@ -1,8 +1,8 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
 from app.core.config import settings
 from app.core.security import create_access_token
 from app.crud.user import user
@@ -14,10 +14,10 @@ router = APIRouter()
 @router.post("/login", response_model=Token)
 async def login(
     login_data: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """User login"""
-    db_user = user.authenticate(
+    db_user = await user.authenticate_async(
         db, username=login_data.username, password=login_data.password
     )
     if not db_user:
@@ -45,10 +45,10 @@ async def login(
 @router.post("/login/form", response_model=Token)
 async def login_form(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """User login with form data (OAuth2 compatible)"""
-    db_user = user.authenticate(
+    db_user = await user.authenticate_async(
         db, username=form_data.username, password=form_data.password
     )
     if not db_user:
@@ -76,18 +76,18 @@ async def login_form(
 @router.post("/register", response_model=User)
 async def register(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """User registration"""
     # Check if user already exists
-    db_user = user.get_by_username(db, username=user_in.username)
+    db_user = await user.get_by_username_async(db, username=user_in.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
-    db_user = user.get_by_email(db, email=user_in.email)
+    db_user = await user.get_by_email_async(db, email=user_in.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -95,5 +95,5 @@ async def register(
         )
     
     # Create new user
-    db_user = user.create(db, obj_in=user_in)
+    db_user = await user.create_async(db, obj_in=user_in)
     return db_user
\ No newline at end of file
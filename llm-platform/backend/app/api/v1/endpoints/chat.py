@@ -1,17 +1,24 @@
+import math
 import time
 import uuid
-from typing import AsyncGenerator
+from typing import AsyncGenerator, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from app.db.database import get_db
 from app.middleware.auth import get_current_api_key
-from app.middleware.rate_limit import check_rate_limit
-from app.crud.model import model as model_crud
-from app.crud.access_log import access_log
-from app.schemas.chat import ChatCompletionRequest, ChatCompletionResponse
+from app.middleware.rate_limit import (
+    check_rate_limit, estimate_prompt_tokens, reserve_tokens, TokenReservation
+)
+from app.services.access_log_writer import access_log_writer
+from app.services.circuit_breaker import UpstreamUnavailableError
+from app.services.completion_cache import (
+    CACHE_HEADER, completion_cache, is_cacheable, prompt_hash, replay_chunks,
+    response_from_stream
+)
+from app.schemas.chat import ChatCompletionRequest, ChatCompletionResponse, ChatCompletionUsage
 from app.services.mock_service import MockModelService
 from app.services.model_service import ModelService
+from app.services.model_registry import ModelDescriptor, model_registry
+from app.services.single_flight import Subscription, single_flight
 from app.core.config import settings
 from app.models.api_key import APIKey
 from app.models.user import User
@@ -29,7 +36,6 @@ async def create_chat_completion(
     request: Request,
     chat_request: ChatCompletionRequest,
     response: Response,
-    db: Session = Depends(get_db),
     auth_data: tuple[APIKey, User] = Depends(get_current_api_key)
 ):
     """Create a chat completion (OpenAI compatible)"""
@@ -44,35 +50,75 @@ async def create_chat_completion(
             response.headers[key] = value
     
     start_time = time.time()
+    db_model = None
+    reservation = None
+    request_hash = None
     
     try:
-        # Get model
-        db_model = model_crud.get_by_name(db, name=chat_request.model)
+        # Resolve the model from the in-memory registry, no DB round trip
+        db_model = model_registry.get(chat_request.model)
         if not db_model or not db_model.is_active:
             raise HTTPException(
                 status_code=404,
                 detail=f"Model '{chat_request.model}' not found or inactive"
             )
         
+        # Token and per-model quotas, settled once actual usage is known
+        reservation = await reserve_tokens(
+            request, chat_request, db_model, user_obj.id, api_key_obj.id
+        )
+        for key, value in request.state.rate_limit_headers.items():
+            response.headers[key] = value
+        
+        # Exact-match cache and single-flight coalescing for deterministic requests
+        cache_key = None
+        cached = None
+        coalesced = False
+        if is_cacheable(chat_request, request.headers.get(CACHE_HEADER)):
+            request_hash = prompt_hash(chat_request, db_model.name)
+        if request_hash and completion_cache:
+            cache_key = completion_cache.key(request_hash, user_obj.id)
+            cached = await completion_cache.get(cache_key)
+            response.headers[CACHE_HEADER] = "hit" if cached else "miss"
+        
         # Handle streaming vs non-streaming
         if chat_request.stream:
+            cache_headers = {CACHE_HEADER: response.headers[CACHE_HEADER]} if cache_key else {}
             return StreamingResponse(
-                _stream_chat_completion(chat_request, db_model, api_key_obj, user_obj, db, start_time),
+                _stream_chat_completion(
+                    chat_request, db_model, api_key_obj, user_obj, start_time, reservation,
+                    request_hash=request_hash, cache_key=cache_key, cached=cached
+                ),
                 media_type="text/event-stream",
                 headers={
+                    **request.state.rate_limit_headers,
+                    **cache_headers,
                     "Cache-Control": "no-cache",
                     "Connection": "keep-alive",
                     "X-Accel-Buffering": "no"  # Disable nginx buffering
                 }
             )
         else:
-            # Non-streaming response
-            completion_response = await model_service.chat_completion(chat_request, db_model)
+            # Non-streaming response, a cache hit costs no upstream tokens
+            if cached:
+                completion_response = cached
+                await reservation.settle(0)
+            else:
+                # Identical requests in flight share one upstream call, each
+                # caller is still billed for the full usage
+                if request_hash and single_flight:
+                    completion_response, coalesced = await single_flight.call(
+                        request_hash, lambda: model_service.chat_completion(chat_request, db_model)
+                    )
+                else:
+                    completion_response = await model_service.chat_completion(chat_request, db_model)
+                await reservation.settle(completion_response.usage.total_tokens)
+                if cache_key:
+                    await completion_cache.set(cache_key, completion_response)
             
             # Log the request
             latency_ms = int((time.time() - start_time) * 1000)
-            access_log.create_log(
-                db=db,
+            await access_log_writer.submit(
                 user_id=user_obj.id,
                 api_key_id=api_key_obj.id,
                 model_id=db_model.id,
@@ -82,6 +128,9 @@ async def create_chat_completion(
                 prompt_tokens=completion_response.usage.prompt_tokens,
                 completion_tokens=completion_response.usage.completion_tokens,
                 total_tokens=completion_response.usage.total_tokens,
+                prompt_hash=request_hash,
+                cache_hit=cached is not None,
+                coalesced=coalesced,
                 ip_address=request.client.host if request.client else None,
                 user_agent=request.headers.get("User-Agent")
             )
@@ -89,40 +138,77 @@ async def create_chat_completion(
             return completion_response
             
     except Exception as e:
-        # Log error
+        if reservation:
+            await reservation.settle(0)
+        
+        # Log error, keeping the status of deliberate HTTP errors (404, 429)
+        if isinstance(e, HTTPException):
+            status_code = e.status_code
+        elif isinstance(e, UpstreamUnavailableError):
+            status_code = 503
+        else:
+            status_code = 500
         latency_ms = int((time.time() - start_time) * 1000)
-        access_log.create_log(
-            db=db,
+        await access_log_writer.submit(
             user_id=user_obj.id,
             api_key_id=api_key_obj.id,
-            model_id=db_model.id if 'db_model' in locals() else 0,
+            model_id=db_model.id if db_model else 0,
             request_type="chat",
-            status_code=500,
+            status_code=status_code,
             latency_ms=latency_ms,
-            error_message=str(e),
+            error_message=str(e.detail) if isinstance(e, HTTPException) else str(e),
+            prompt_hash=request_hash,
             ip_address=request.client.host if request.client else None,
             user_agent=request.headers.get("User-Agent")
         )
-        raise HTTPException(status_code=500, detail=str(e))
+        if isinstance(e, HTTPException):
+            raise
+        headers = None
+        if isinstance(e, UpstreamUnavailableError) and e.retry_after is not None:
+            # When the first open circuit breaker will let a probe through
+            headers = {"Retry-After": str(math.ceil(e.retry_after))}
+        raise HTTPException(status_code=status_code, detail=str(e), headers=headers)
 
 async def _stream_chat_completion(
     chat_request: ChatCompletionRequest,
-    db_model,
+    db_model: ModelDescriptor,
     api_key_obj: APIKey,
     user_obj: User,
-    db: Session,
-    start_time: float
+    start_time: float,
+    reservation: TokenReservation,
+    request_hash: Optional[str] = None,
+    cache_key: Optional[str] = None,
+    cached: Optional[ChatCompletionResponse] = None
 ) -> AsyncGenerator[str, None]:
-    """Stream chat completion chunks"""
+    """Stream chat completion chunks, replaying a cached response when given one"""
+    total_tokens = 0
+    prompt_tokens = estimate_prompt_tokens(chat_request.messages)
+    completion_tokens = 0
+    first_chunk = None
+    content: List[str] = []
+    finish_reason = None
     try:
-        total_tokens = 0
-        prompt_tokens = 0
-        completion_tokens = 0
+        if cached:
+            chunks = replay_chunks(cached)
+            prompt_tokens = cached.usage.prompt_tokens
+            completion_tokens = cached.usage.completion_tokens
+        elif request_hash and single_flight:
+            # Fan one upstream stream out to every identical request in flight
+            chunks = single_flight.stream(
+                request_hash, lambda: model_service.chat_completion_stream(chat_request, db_model)
+            )
+        else:
+            chunks = model_service.chat_completion_stream(chat_request, db_model)
         
-        async for chunk in model_service.chat_completion_stream(chat_request, db_model):
-            # Update token counts (simplified)
-            if chunk.choices and chunk.choices[0].delta.content:
-                completion_tokens += len(chunk.choices[0].delta.content.split())
+        async for chunk in _iterate(chunks):
+            if not cached and chunk.choices:
+                # Update token counts (simplified)
+                if chunk.choices[0].delta.content:
+                    completion_tokens += len(chunk.choices[0].delta.content.split())
+                    if cache_key:
+                        content.append(chunk.choices[0].delta.content)
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                first_chunk = first_chunk or chunk
             
             # Send chunk as SSE
             chunk_json = chunk.json(exclude_unset=True)
@@ -131,12 +217,22 @@ async def _stream_chat_completion(
         # Send [DONE] signal
         yield "data: [DONE]\n\n"
         
-        # Log the streaming request
+        # Log the streaming request, a replayed stream costs no upstream tokens
         latency_ms = int((time.time() - start_time) * 1000)
         total_tokens = prompt_tokens + completion_tokens
+        await reservation.settle(0 if cached else total_tokens)
         
-        access_log.create_log(
-            db=db,
+        if cache_key and first_chunk and not cached:
+            await completion_cache.set(cache_key, response_from_stream(
+                first_chunk, content, finish_reason,
+                ChatCompletionUsage(
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    total_tokens=total_tokens
+                )
+            ))
+        
+        await access_log_writer.submit(
             user_id=user_obj.id,
             api_key_id=api_key_obj.id,
             model_id=db_model.id,
@@ -145,28 +241,44 @@ async def _stream_chat_completion(
             latency_ms=latency_ms,
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
-            total_tokens=total_tokens
+            total_tokens=total_tokens,
+            prompt_hash=request_hash,
+            cache_hit=cached is not None,
+            coalesced=isinstance(chunks, Subscription) and chunks.shared
         )
         
     except Exception as e:
-        # Log streaming error
+        # Log streaming error, with the same status a non-streaming request gets
+        unavailable = isinstance(e, UpstreamUnavailableError)
         latency_ms = int((time.time() - start_time) * 1000)
-        access_log.create_log(
-            db=db,
+        await access_log_writer.submit(
             user_id=user_obj.id,
             api_key_id=api_key_obj.id,
             model_id=db_model.id,
             request_type="chat_stream",
-            status_code=500,
+            status_code=503 if unavailable else 500,
             latency_ms=latency_ms,
-            error_message=str(e)
+            error_message=str(e),
+            prompt_hash=request_hash
         )
         
         error_chunk = {
             "error": {
                 "message": str(e),
                 "type": "server_error",
-                "code": "internal_error"
+                "code": "upstream_unavailable" if unavailable else "internal_error"
             }
         }
-        yield f"data: {error_chunk}\n\n"
\ No newline at end of file
+        yield f"data: {error_chunk}\n\n"
+    finally:
+        # Also runs when the client disconnects mid-stream
+        await reservation.settle(0 if cached else prompt_tokens + completion_tokens)
+
+async def _iterate(chunks):
+    """Iterate a list of replayed chunks or a live async stream alike"""
+    if isinstance(chunks, list):
+        for chunk in chunks:
+            yield chunk
+    else:
+        async for chunk in chunks:
+            yield chunk
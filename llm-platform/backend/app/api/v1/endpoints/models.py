@@ -1,7 +1,7 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
 from app.middleware.auth import get_current_user
 from app.crud.model import model
 from app.schemas.model import Model
@@ -11,32 +11,32 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Model])
 async def list_models(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     skip: int = 0,
     limit: int = 100
 ):
     """List all available models"""
-    models = model.get_active_models(db)
+    models = await model.get_active_models_async(db)
     return models
 
 @router.get("/active", response_model=List[Model])
 async def list_active_models(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """List only active models"""
-    models = model.get_active_models(db)
+    models = await model.get_active_models_async(db)
     return models
 
 @router.get("/{model_id}", response_model=Model)
 async def get_model(
     model_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific model by ID"""
-    db_model = model.get(db, id=model_id)
+    db_model = await model.get_async(db, id=model_id)
     if not db_model:
         raise HTTPException(status_code=404, detail="Model not found")
     return db_model
@@ -44,11 +44,11 @@ async def get_model(
 @router.get("/name/{model_name}", response_model=Model)
 async def get_model_by_name(
     model_name: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific model by name"""
-    db_model = model.get_by_name(db, name=model_name)
+    db_model = await model.get_by_name_async(db, name=model_name)
     if not db_model:
         raise HTTPException(status_code=404, detail="Model not found")
     return db_model
\ No newline at end of file
@@ -1,8 +1,8 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.middleware.auth import get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
+from app.middleware.auth import get_current_user, invalidate_user
 from app.crud.user import user
 from app.schemas.user import User, UserUpdate
 from app.models.user import User as UserModel
@@ -19,24 +19,25 @@ async def get_current_user_info(
 @router.put("/me", response_model=User)
 async def update_current_user(
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user)
 ):
     """Update current user information"""
-    updated_user = user.update(db, db_obj=current_user, obj_in=user_update)
+    updated_user = await user.update_async(db, db_obj=current_user, obj_in=user_update)
+    await invalidate_user(db, current_user.id)
     return updated_user
 
 @router.get("/{user_id}", response_model=User)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user)
 ):
     """Get user by ID (admin only or own profile)"""
     if user_id != current_user.id and not user.is_admin(current_user):
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    db_user = user.get(db, id=user_id)
+    db_user = await user.get_async(db, id=user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
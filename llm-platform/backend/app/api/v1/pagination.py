@@ -0,0 +1,31 @@
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud.base import CRUDBase
+
+# Response header carrying the cursor for the next page, absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+async def fetch_page(
+    crud: CRUDBase,
+    db: AsyncSession,
+    response: Response,
+    *,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False,
+    where: Sequence[Any] = ()
+) -> List[Any]:
+    """Fetch one keyset page and expose the next cursor as a header.
+
+    The body stays a plain list so existing clients keep working.
+    """
+    try:
+        items, next_cursor = await crud.get_page_async(
+            db, cursor=cursor, limit=limit, descending=descending, where=where
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
@@ -0,0 +1,201 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from collections import OrderedDict
+import asyncio
+import threading
+import time
+
+class TTLCache:
+    """Bounded in-process cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[1] if entry else None
+
+    def discard_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Remove every entry whose value matches predicate"""
+        with self._lock:
+            stale = [k for k, (_, value) in self._data.items() if predicate(value)]
+            for k in stale:
+                del self._data[k]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+class SizedTTLCache:
+    """In-process LRU of bytes values bounded by total size, with a TTL per entry"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.bytes -= len(value)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Store value, returns False if it alone exceeds max_bytes"""
+        if len(value) > self.max_bytes:
+            return False
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[1])
+            self._data[key] = (expires_at, value)
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+class SnapshotCache:
+    """Single cached value refreshed with stale-while-revalidate semantics.
+
+    Within ttl the snapshot is served as is. Once older than ttl it is still
+    served while one background task reloads it. Past max_stale, or before
+    the first load, callers wait for the reload. Concurrent loads share one
+    task.
+    """
+
+    def __init__(self, ttl: float = 10.0, max_stale: float = 300.0):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._value: Any = None
+        self._loaded_at: Optional[float] = None
+        self._refresh: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    async def _load(self, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+        except Exception:
+            self.errors += 1
+            raise
+        self._value, self._loaded_at = value, time.monotonic()
+        self.refreshes += 1
+        return value
+
+    def _start_refresh(self, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._load(loader))
+            # Background failures keep the stale value, mark the exception retrieved
+            self._refresh.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return self._refresh
+
+    async def get(self, loader: Callable[[], Awaitable[Any]]) -> Any:
+        age = None if self._loaded_at is None else time.monotonic() - self._loaded_at
+        if age is not None and age < self.ttl:
+            self.hits += 1
+            return self._value
+        if age is not None and age < self.max_stale:
+            self.stale_hits += 1
+            self._start_refresh(loader)
+            return self._value
+        self.misses += 1
+        return await asyncio.shield(self._start_refresh(loader))
+
+    def clear(self) -> None:
+        self._value, self._loaded_at = None, None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": self.ttl,
+            "max_stale_seconds": self.max_stale,
+            "age_seconds": (
+                time.monotonic() - self._loaded_at if self._loaded_at is not None else None
+            ),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "errors": self.errors
+        }
@@ -11,6 +11,13 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./llm_platform.db"
+    ASYNC_DATABASE_URL: Optional[str] = None  # Derived from DATABASE_URL when unset
+    # Admin analytics and list queries read from a replica, or from the primary
+    # through their own small pool so they never take request-path connections
+    READ_DATABASE_URL: Optional[str] = None  # Same form as DATABASE_URL, None uses the primary
+    READ_DB_POOL_SIZE: int = 2
+    READ_DB_MAX_OVERFLOW: int = 0
+    READ_DB_POOL_TIMEOUT_SECONDS: float = 30.0
     
     # JWT
     SECRET_KEY: str = "your-super-secret-jwt-key-here-change-in-production"
@@ -28,6 +35,70 @@ class Settings(BaseSettings):
     RATE_LIMIT_PER_MINUTE: int = 60
     RATE_LIMIT_REQUESTS: Optional[int] = None
     RATE_LIMIT_WINDOW: Optional[int] = None
+    RATE_LIMIT_BURST: Optional[int] = None  # Defaults to the per-window limit
+    RATE_LIMIT_MAX_KEYS: int = 100000  # Tracked keys per process before LRU spill
+    RATE_LIMIT_BACKEND: str = "memory"  # 'memory' (per worker) or 'redis' (shared via REDIS_URL)
+    RATE_LIMIT_REDIS_TIMEOUT_SECONDS: float = 0.5  # Connect and command timeout before falling back
+    TOKEN_RATE_LIMIT_PER_MINUTE: Optional[int] = 100000  # Per API key, None to disable
+    
+    # Authentication principal cache (per process)
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_SYNC_POLL_SECONDS: float = 2.0  # Max delay before other workers see a revocation
+    
+    # Admin overview snapshot, served stale while a background refresh runs
+    STATS_OVERVIEW_TTL_SECONDS: float = 10.0
+    STATS_OVERVIEW_MAX_STALE_SECONDS: float = 300.0
+    
+    # API key usage counters are buffered and flushed on this interval
+    API_KEY_USAGE_FLUSH_INTERVAL_SECONDS: float = 5.0
+    
+    # Access logs are queued and bulk-inserted by a background writer
+    ACCESS_LOG_QUEUE_SIZE: int = 10000
+    ACCESS_LOG_BATCH_SIZE: int = 500
+    ACCESS_LOG_FLUSH_INTERVAL_SECONDS: float = 1.0
+    ACCESS_LOG_OVERFLOW: str = "drop"  # 'drop' (count and discard) or 'block' when the queue is full
+    ACCESS_LOG_WRITE_RETRIES: int = 3  # Retries of a failed batch commit before writing it row by row
+    ACCESS_LOG_RETRY_DELAY_SECONDS: float = 0.5  # Doubled on each retry
+    
+    # Access logs older than the retention age move to daily gzip NDJSON archives
+    ACCESS_LOG_RETENTION_DAYS: Optional[int] = None  # e.g. 90, None keeps everything in the table
+    ACCESS_LOG_ARCHIVE_DIR: str = "./data/archives/access_logs"
+    ACCESS_LOG_ARCHIVE_BATCH_SIZE: int = 5000  # Rows read and deleted per statement
+    ACCESS_LOG_RETENTION_INTERVAL_SECONDS: float = 3600.0
+    
+    # Model registry: workers poll the models version and reload on change
+    MODEL_REGISTRY_POLL_SECONDS: float = 2.0
+    
+    # Upstream model APIs: one pooled client per origin (scheme://host:port)
+    UPSTREAM_MAX_CONNECTIONS: int = 100  # Per origin
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    UPSTREAM_HTTP2: bool = False  # Requires the h2 package
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    UPSTREAM_WRITE_TIMEOUT_SECONDS: float = 10.0
+    UPSTREAM_POOL_TIMEOUT_SECONDS: float = 10.0  # Wait for a free connection in the pool
+    UPSTREAM_FIRST_BYTE_TIMEOUT_SECONDS: float = 60.0  # Until response headers arrive
+    UPSTREAM_READ_TIMEOUT_SECONDS: float = 30.0  # Per body read, catches stalled streams
+    
+    # Routing across a model's deployments (model_metadata['deployments'])
+    LOAD_BALANCING_POLICY: str = "weighted"  # 'weighted' (random by weight) or 'least_outstanding'
+    LOAD_BALANCING_EWMA_ALPHA: float = 0.2  # Smoothing of the latency and error rate averages
+    # Per-deployment circuit breaker, failover order comes from model_metadata['fallbacks']
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive upstream failures that open it
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = 30.0  # Fast-fail period before a half-open probe
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = 1  # Probes allowed at once while half-open
+    
+    # Exact-match completion cache, only for temperature 0 or X-Completion-Cache: on
+    COMPLETION_CACHE_ENABLED: bool = True
+    COMPLETION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # In-memory tier, per process
+    COMPLETION_CACHE_TTL_SECONDS: float = 3600.0
+    COMPLETION_CACHE_DIR: Optional[str] = None  # On-disk tier, e.g. ./data/completion_cache
+    COMPLETION_CACHE_DISK_TTL_SECONDS: float = 86400.0
+    COMPLETION_CACHE_DISK_MAX_BYTES: int = 1024 * 1024 * 1024  # Oldest entries go first past this
+    COMPLETION_CACHE_DISK_SWEEP_SECONDS: float = 300.0  # How often a worker sweeps the disk tier
+    COMPLETION_CACHE_SHARED: bool = False  # Share entries across users instead of per user
+    SINGLE_FLIGHT_ENABLED: bool = True  # Coalesce identical in-flight cacheable requests, across users
     
     # Demo mode and mock service
     DEMO_MODE: bool = True
@@ -1,4 +1,6 @@
 from datetime import datetime, timedelta
+import hashlib
+import hmac
 from typing import Any, Union, Optional
 from jose import jwt, JWTError
 from passlib.context import CryptContext
@@ -33,6 +35,16 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def hash_api_key(api_key: str) -> str:
+    """Keyed digest of an API key, stored in the indexed key_hash column"""
+    return hmac.new(
+        settings.SECRET_KEY.encode(), api_key.encode(), hashlib.sha256
+    ).hexdigest()
+
+def is_legacy_key_hash(key_hash: str) -> bool:
+    """Keys created before keyed digests were stored as bcrypt hashes"""
+    return key_hash.startswith("$2")
+
 def generate_api_key() -> str:
     """Generate a random API key"""
     import secrets
@@ -2,5 +2,7 @@ from .user import user
 from .api_key import api_key
 from .model import model
 from .access_log import access_log
+from .usage_stat import usage_stat
+from .config_version import config_version
 
-__all__ = ["user", "api_key", "model", "access_log"]
\ No newline at end of file
+__all__ = ["user", "api_key", "model", "access_log", "usage_stat", "config_version"]
\ No newline at end of file
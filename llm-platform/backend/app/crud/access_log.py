@@ -1,11 +1,23 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, and_
-from datetime import datetime, date
+from sqlalchemy import desc, func, and_, delete, insert, select
+from datetime import datetime, date, time, timedelta
 from app.crud.base import CRUDBase
 from app.models.access_log import AccessLog
 from app.schemas.access_log import AccessLogCreate
 
+def day_range(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """Half-open [start, end) timestamps covering start_date..end_date inclusive.
+
+    Comparing created_at directly keeps the filter sargable, unlike
+    func.date(created_at) which forces a scan.
+    """
+    return (
+        datetime.combine(start_date, time.min),
+        datetime.combine(end_date + timedelta(days=1), time.min)
+    )
+
 class AccessLogCreate:
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
@@ -30,7 +42,7 @@ class CRUDAccessLog(CRUDBase[AccessLog, AccessLogCreate, dict]):
         user_agent: Optional[str] = None,
         error_message: Optional[str] = None
     ) -> AccessLog:
-        db_obj = AccessLog(
+        row = dict(
             user_id=user_id,
             api_key_id=api_key_id,
             model_id=model_id,
@@ -45,38 +57,80 @@ class CRUDAccessLog(CRUDBase[AccessLog, AccessLogCreate, dict]):
             user_agent=user_agent,
             error_message=error_message,
         )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+        return self._insert_rows(db, [row])[0]
 
-    def get_by_user(self, db: Session, *, user_id: int, limit: int = 100) -> List[AccessLog]:
-        return (
-            db.query(AccessLog)
-            .filter(AccessLog.user_id == user_id)
-            .order_by(desc(AccessLog.created_at))
-            .limit(limit)
-            .all()
-        )
+    async def create_log_async(self, db: AsyncSession, **kwargs) -> AccessLog:
+        """Async create_log, takes the same keyword arguments"""
+        return (await self._insert_rows_async(db, [kwargs]))[0]
 
-    def get_stats_by_date(
-        self, db: Session, *, start_date: date, end_date: date, user_id: Optional[int] = None
+    async def create_logs_batch_async(self, db: AsyncSession, *, rows: List[Dict[str, Any]]) -> int:
+        """Bulk insert log rows in one executemany, rows must share the same keys.
+
+        The caller commits, so rollups can be updated in the same transaction.
+        """
+        if not rows:
+            return 0
+        await db.execute(insert(AccessLog), rows)
+        return len(rows)
+
+    def get_by_user(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 100
+    ) -> List[AccessLog]:
+        """Newest logs for a user, optionally within [start, end)"""
+        query = db.query(AccessLog).filter(AccessLog.user_id == user_id)
+        if start is not None:
+            query = query.filter(AccessLog.created_at >= start)
+        if end is not None:
+            query = query.filter(AccessLog.created_at < end)
+        return query.order_by(desc(AccessLog.created_at)).limit(limit).all()
+
+    def get_oldest_created_at(self, db: Session) -> Optional[datetime]:
+        return db.execute(select(func.min(AccessLog.created_at))).scalar()
+
+    def remove_ids(self, db: Session, *, ids: List[int]) -> int:
+        """Delete one bounded batch of logs by primary key"""
+        result = db.execute(delete(AccessLog).where(AccessLog.id.in_(ids)))
+        db.commit()
+        return result.rowcount
+
+    def _stats_by_date_query(
+        self, *, start_date: date, end_date: date, user_id: Optional[int] = None
     ):
-        query = db.query(
+        start, end = day_range(start_date, end_date)
+        query = select(
             func.date(AccessLog.created_at).label('date'),
             func.count(AccessLog.id).label('request_count'),
             func.sum(AccessLog.total_tokens).label('total_tokens'),
             func.avg(AccessLog.latency_ms).label('avg_latency'),
         ).filter(
             and_(
-                func.date(AccessLog.created_at) >= start_date,
-                func.date(AccessLog.created_at) <= end_date
+                AccessLog.created_at >= start,
+                AccessLog.created_at < end
             )
         )
         
         if user_id:
             query = query.filter(AccessLog.user_id == user_id)
             
-        return query.group_by(func.date(AccessLog.created_at)).all()
+        return query.group_by(func.date(AccessLog.created_at))
+
+    def get_stats_by_date(
+        self, db: Session, *, start_date: date, end_date: date, user_id: Optional[int] = None
+    ):
+        query = self._stats_by_date_query(start_date=start_date, end_date=end_date, user_id=user_id)
+        return db.execute(query).all()
+
+    async def get_stats_by_date_async(
+        self, db: AsyncSession, *, start_date: date, end_date: date, user_id: Optional[int] = None
+    ):
+        query = self._stats_by_date_query(start_date=start_date, end_date=end_date, user_id=user_id)
+        result = await db.execute(query)
+        return result.all()
 
 access_log = CRUDAccessLog(AccessLog)
\ No newline at end of file
@@ -1,9 +1,14 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+import asyncio
+from sqlalchemy import bindparam, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
 from app.models.api_key import APIKey
 from app.schemas.api_key import APIKeyCreate, APIKeyUpdate
-from app.core.security import get_password_hash, generate_api_key
+from app.core.security import (
+    generate_api_key, hash_api_key, is_legacy_key_hash, verify_password
+)
 from datetime import datetime
 
 class CRUDAPIKey(CRUDBase[APIKey, APIKeyCreate, APIKeyUpdate]):
@@ -16,38 +21,99 @@ class CRUDAPIKey(CRUDBase[APIKey, APIKeyCreate, APIKeyUpdate]):
     def get_by_prefix(self, db: Session, *, key_prefix: str) -> Optional[APIKey]:
         return db.query(APIKey).filter(APIKey.key_prefix == key_prefix).first()
 
-    def create(self, db: Session, *, obj_in: APIKeyCreate, user_id: int) -> tuple[APIKey, str]:
+    def _new_key(self, obj_in: APIKeyCreate, user_id: int) -> tuple[dict, str]:
         # Generate actual API key
         api_key = generate_api_key()
-        key_hash = get_password_hash(api_key)
+        key_hash = hash_api_key(api_key)
         key_prefix = api_key[:8] + "..."
         
-        db_obj = APIKey(
-            user_id=user_id,
-            name=obj_in.name,
-            key_hash=key_hash,
-            key_prefix=key_prefix,
-            expires_at=obj_in.expires_at,
+        row = {
+            "user_id": user_id,
+            "name": obj_in.name,
+            "key_hash": key_hash,
+            "key_prefix": key_prefix,
+            "expires_at": obj_in.expires_at,
+        }
+        return row, api_key
+
+    def create(self, db: Session, *, obj_in: APIKeyCreate, user_id: int) -> tuple[APIKey, str]:
+        row, api_key = self._new_key(obj_in, user_id)
+        return self._insert_rows(db, [row])[0], api_key
+
+    def create_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[APIKeyCreate],
+        user_ids: Sequence[int],
+        chunk_size: int = 500
+    ) -> List[tuple[APIKey, str]]:
+        """Create one key per (obj_in, user_id) pair, returns (APIKey, raw key) pairs"""
+        rows, raw_keys = [], []
+        for obj_in, user_id in zip(objs_in, user_ids):
+            row, raw_key = self._new_key(obj_in, user_id)
+            rows.append(row)
+            raw_keys.append(raw_key)
+        created = self._insert_rows(db, rows, chunk_size=chunk_size)
+        return list(zip(created, raw_keys))
+
+    def verify_key(self, db: Session, *, api_key: str) -> Optional[APIKey]:
+        # Single indexed lookup on the keyed digest
+        key_obj = db.query(APIKey).filter(
+            APIKey.key_hash == hash_api_key(api_key),
+            APIKey.is_active == True
+        ).first()
+        if key_obj is None:
+            key_obj = self._verify_legacy_key(db, api_key=api_key)
+        return key_obj
+
+    def record_usage_batch(
+        self, db: Session, *, usage: Dict[int, Tuple[int, datetime]]
+    ) -> None:
+        """Apply buffered (usage_count delta, last_used_at) pairs in one executemany"""
+        if not usage:
+            return
+        table = APIKey.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                usage_count=func.coalesce(table.c.usage_count, 0) + bindparam("b_delta"),
+                # Never move last_used_at backwards when workers flush out of order
+                last_used_at=case(
+                    (
+                        or_(
+                            table.c.last_used_at.is_(None),
+                            table.c.last_used_at < bindparam("b_used_at")
+                        ),
+                        bindparam("b_used_at")
+                    ),
+                    else_=table.c.last_used_at
+                )
+            )
         )
-        db.add(db_obj)
+        db.execute(stmt, [
+            {"b_id": key_id, "b_delta": delta, "b_used_at": used_at}
+            for key_id, (delta, used_at) in usage.items()
+        ])
         db.commit()
-        db.refresh(db_obj)
-        return db_obj, api_key
 
-    def verify_key(self, db: Session, *, api_key: str) -> Optional[APIKey]:
-        from app.core.security import verify_password
-        
-        # Check if key exists by trying to verify against all keys
-        # This is not optimal for large datasets, but works for demo
-        api_keys = db.query(APIKey).filter(APIKey.is_active == True).all()
-        for key_obj in api_keys:
-            if verify_password(api_key, key_obj.key_hash):
-                # Update last used
-                key_obj.last_used_at = datetime.utcnow()
-                key_obj.usage_count += 1
-                db.commit()
-                return key_obj
-        return None
+    def _verify_legacy_key(self, db: Session, *, api_key: str) -> Optional[APIKey]:
+        """Verify a key stored as bcrypt and re-hash it on success.
+
+        key_prefix is unique, so at most one bcrypt check is needed.
+        """
+        key_obj = db.query(APIKey).filter(
+            APIKey.key_prefix == api_key[:8] + "...",
+            APIKey.is_active == True
+        ).first()
+        if key_obj is None or not is_legacy_key_hash(key_obj.key_hash):
+            return None
+        if not verify_password(api_key, key_obj.key_hash):
+            return None
+        key_obj.key_hash = hash_api_key(api_key)
+        db.commit()
+        return key_obj
 
     def get_active_keys(self, db: Session, *, user_id: int) -> List[APIKey]:
         return db.query(APIKey).filter(
@@ -55,4 +121,43 @@ class CRUDAPIKey(CRUDBase[APIKey, APIKeyCreate, APIKeyUpdate]):
             APIKey.is_active == True
         ).all()
 
+    async def get_by_user_async(self, db: AsyncSession, *, user_id: int) -> List[APIKey]:
+        result = await db.execute(select(APIKey).filter(APIKey.user_id == user_id))
+        return result.scalars().all()
+
+    async def get_active_keys_async(self, db: AsyncSession, *, user_id: int) -> List[APIKey]:
+        result = await db.execute(select(APIKey).filter(
+            APIKey.user_id == user_id,
+            APIKey.is_active == True
+        ))
+        return result.scalars().all()
+
+    async def create_async(
+        self, db: AsyncSession, *, obj_in: APIKeyCreate, user_id: int
+    ) -> tuple[APIKey, str]:
+        row, api_key = self._new_key(obj_in, user_id)
+        return (await self._insert_rows_async(db, [row]))[0], api_key
+
+    async def verify_key_async(self, db: AsyncSession, *, api_key: str) -> Optional[APIKey]:
+        result = await db.execute(select(APIKey).filter(
+            APIKey.key_hash == hash_api_key(api_key),
+            APIKey.is_active == True
+        ))
+        key_obj = result.scalars().first()
+        if key_obj is not None:
+            return key_obj
+
+        result = await db.execute(select(APIKey).filter(
+            APIKey.key_prefix == api_key[:8] + "...",
+            APIKey.is_active == True
+        ))
+        key_obj = result.scalars().first()
+        if key_obj is None or not is_legacy_key_hash(key_obj.key_hash):
+            return None
+        if not await asyncio.to_thread(verify_password, api_key, key_obj.key_hash):
+            return None
+        key_obj.key_hash = hash_api_key(api_key)
+        await db.commit()
+        return key_obj
+
 api_key = CRUDAPIKey(APIKey)
\ No newline at end of file
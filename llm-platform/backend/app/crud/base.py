@@ -1,16 +1,111 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+from datetime import datetime
+import base64
+import json
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import String, func, insert, or_, select, type_coerce, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from app.db.database import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+def encode_cursor(created_at: Any, id: int) -> str:
+    """Opaque page cursor for a (created_at, id) keyset position"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Inverse of encode_cursor, raises ValueError for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(id, int):
+        raise ValueError("Invalid cursor")
+    return created_at, id
+
+def _chunks(rows: List[Any], size: int):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
+        # Mapped attribute name -> table column, read once from the mapper
+        self.columns = {attr.key: attr.columns[0] for attr in sa_inspect(model).column_attrs}
+
+    def _keyset_column(self, dialect_name: str):
+        # SQLite stores DATETIME as text, in a different format for server
+        # defaults and Python-side values, so compare the exact stored text
+        if dialect_name == "sqlite":
+            return type_coerce(self.model.created_at, String)
+        return self.model.created_at
+
+    def _page_query(
+        self,
+        dialect_name: str,
+        *,
+        cursor: Optional[str],
+        limit: int,
+        descending: bool,
+        where: Sequence[Any]
+    ):
+        """Keyset page on (created_at, id), one extra row tells if more remain"""
+        created_at = self._keyset_column(dialect_name)
+        query = select(self.model, created_at.label("keyset_created_at")).filter(*where)
+        if cursor:
+            after_created_at, after_id = decode_cursor(cursor)
+            if dialect_name != "sqlite":
+                after_created_at = datetime.fromisoformat(after_created_at)
+            if descending:
+                query = query.filter(
+                    created_at <= after_created_at,
+                    or_(created_at < after_created_at, self.model.id < after_id)
+                )
+            else:
+                query = query.filter(
+                    created_at >= after_created_at,
+                    or_(created_at > after_created_at, self.model.id > after_id)
+                )
+        if descending:
+            query = query.order_by(created_at.desc(), self.model.id.desc())
+        else:
+            query = query.order_by(created_at, self.model.id)
+        return query.limit(limit + 1)
+
+    def _page_result(self, rows, limit: int) -> Tuple[List[ModelType], Optional[str]]:
+        items = [obj for obj, _ in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            obj, created_at = rows[limit - 1]
+            next_cursor = encode_cursor(created_at, obj.id)
+        return items, next_cursor
+
+    def get_page(
+        self,
+        db: Session,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        descending: bool = False,
+        where: Sequence[Any] = ()
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Fetch one page after cursor, returns (items, next_cursor or None)"""
+        query = self._page_query(
+            db.get_bind().dialect.name, cursor=cursor, limit=limit,
+            descending=descending, where=where
+        )
+        return self._page_result(db.execute(query).all(), limit)
 
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         return db.query(self.model).filter(self.model.id == id).first()
@@ -21,11 +116,32 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return db.query(self.model).offset(skip).limit(limit).all()
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data)
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        return self._insert_rows(db, [self._create_row(obj_in)])[0]
+
+    def _update_values(self, obj_in: Union[UpdateSchemaType, Dict[str, Any]]) -> Dict[str, Any]:
+        """Changed fields that map to columns, taken from mapper metadata"""
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        return {k: v for k, v in update_data.items() if k in self.columns}
+
+    def _update_stmt(self, dialect, db_obj: ModelType, values: Dict[str, Any]):
+        """Single UPDATE ... RETURNING every column, None if unsupported"""
+        if not dialect.update_returning:
+            return None
+        return (
+            update(self.model.__table__)
+            .where(self.columns["id"] == db_obj.id)
+            .values({self.columns[k]: v for k, v in values.items()})
+            .returning(*self.columns.values())
+        )
+
+    def _load_returned(self, db_obj: ModelType, row) -> ModelType:
+        # Store the returned row as the loaded state, onupdate columns included,
+        # so nothing is left dirty or expired for a refresh to reload
+        for key, value in zip(self.columns, row):
+            set_committed_value(db_obj, key, value)
         return db_obj
 
     def update(
@@ -35,14 +151,16 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        values = self._update_values(obj_in)
+        if not values:
+            return db_obj
+        stmt = self._update_stmt(db.get_bind().dialect, db_obj, values)
+        if stmt is not None:
+            self._load_returned(db_obj, db.execute(stmt).one())
+            db.commit()
+            return db_obj
+        for field, value in values.items():
+            setattr(db_obj, field, value)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
@@ -52,4 +170,211 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj = db.query(self.model).get(id)
         db.delete(obj)
         db.commit()
-        return obj
\ No newline at end of file
+        return obj
+
+    # Bulk operations: one statement per chunk and a single commit per call
+    def _create_row(self, obj_in: CreateSchemaType) -> Dict[str, Any]:
+        return jsonable_encoder(obj_in)
+
+    def _dialect_insert(self, dialect_name: str):
+        """INSERT construct that supports ON CONFLICT for this dialect"""
+        if dialect_name == "postgresql":
+            return postgresql.insert(self.model)
+        if dialect_name == "sqlite":
+            return sqlite.insert(self.model)
+        raise NotImplementedError(f"Upsert is not supported on {dialect_name}")
+
+    def _insert_many_stmt(self, dialect):
+        # Multi-row INSERT ... RETURNING where the driver supports it, otherwise
+        # the caller falls back to add_all + flush
+        if not dialect.insert_executemany_returning:
+            return None
+        return insert(self.model).returning(self.model, sort_by_parameter_order=True)
+
+    def _upsert_many_stmt(
+        self,
+        dialect_name: str,
+        rows: List[Dict[str, Any]],
+        index_elements: Sequence[str],
+        update_columns: Optional[Sequence[str]]
+    ):
+        stmt = self._dialect_insert(dialect_name)
+        if update_columns is None:
+            update_columns = [k for k in rows[0] if k not in index_elements and k != "id"]
+        set_ = {column: getattr(stmt.excluded, column) for column in update_columns}
+        if "updated_at" in self.model.__table__.c:
+            set_["updated_at"] = func.now()
+        return stmt.on_conflict_do_update(
+            index_elements=list(index_elements), set_=set_
+        ).returning(self.model, sort_by_parameter_order=True)
+
+    def create_many(
+        self, db: Session, *, objs_in: Sequence[CreateSchemaType], chunk_size: int = 500
+    ) -> List[ModelType]:
+        return self._insert_rows(db, [self._create_row(o) for o in objs_in], chunk_size=chunk_size)
+
+    def _insert_rows(
+        self, db: Session, rows: List[Dict[str, Any]], *, chunk_size: int = 500
+    ) -> List[ModelType]:
+        stmt = self._insert_many_stmt(db.get_bind().dialect)
+        created: List[ModelType] = []
+        for chunk in _chunks(rows, chunk_size):
+            if stmt is not None:
+                created.extend(db.scalars(stmt, chunk).all())
+            else:
+                objs = [self.model(**row) for row in chunk]
+                db.add_all(objs)
+                db.flush()
+                created.extend(objs)
+        db.commit()
+        if stmt is None:
+            # Without RETURNING, server defaults are only known after a reload
+            for obj in created:
+                db.refresh(obj)
+        return created
+
+    def update_many(
+        self, db: Session, *, updates: Sequence[Dict[str, Any]], chunk_size: int = 500
+    ) -> int:
+        """Bulk UPDATE by primary key, every dict must carry 'id'"""
+        for chunk in _chunks(list(updates), chunk_size):
+            db.execute(update(self.model), chunk)
+        db.commit()
+        return len(updates)
+
+    def upsert_many(
+        self,
+        db: Session,
+        *,
+        rows: Sequence[Dict[str, Any]],
+        index_elements: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+        chunk_size: int = 500
+    ) -> List[ModelType]:
+        """INSERT ... ON CONFLICT (index_elements) DO UPDATE, returns the rows"""
+        rows = list(rows)
+        if not rows:
+            return []
+        stmt = self._upsert_many_stmt(
+            db.get_bind().dialect.name, rows, index_elements, update_columns
+        )
+        result: List[ModelType] = []
+        for chunk in _chunks(rows, chunk_size):
+            result.extend(db.scalars(
+                stmt, chunk, execution_options={"populate_existing": True}
+            ).all())
+        db.commit()
+        return result
+
+    # Async variants for the request path (AsyncSession)
+    async def get_async(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        return await db.get(self.model, id)
+
+    async def get_multi_async(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        result = await db.execute(select(self.model).offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def get_page_async(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        descending: bool = False,
+        where: Sequence[Any] = ()
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        query = self._page_query(
+            db.get_bind().dialect.name, cursor=cursor, limit=limit,
+            descending=descending, where=where
+        )
+        result = await db.execute(query)
+        return self._page_result(result.all(), limit)
+
+    async def create_async(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        return (await self._insert_rows_async(db, [self._create_row(obj_in)]))[0]
+
+    async def update_async(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        values = self._update_values(obj_in)
+        if not values:
+            return db_obj
+        stmt = self._update_stmt(db.get_bind().dialect, db_obj, values)
+        if stmt is not None:
+            self._load_returned(db_obj, (await db.execute(stmt)).one())
+            await db.commit()
+            return db_obj
+        for field, value in values.items():
+            setattr(db_obj, field, value)
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def remove_async(self, db: AsyncSession, *, id: int) -> ModelType:
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        await db.commit()
+        return obj
+
+    async def create_many_async(
+        self, db: AsyncSession, *, objs_in: Sequence[CreateSchemaType], chunk_size: int = 500
+    ) -> List[ModelType]:
+        rows = [self._create_row(o) for o in objs_in]
+        return await self._insert_rows_async(db, rows, chunk_size=chunk_size)
+
+    async def _insert_rows_async(
+        self, db: AsyncSession, rows: List[Dict[str, Any]], *, chunk_size: int = 500
+    ) -> List[ModelType]:
+        stmt = self._insert_many_stmt(db.get_bind().dialect)
+        created: List[ModelType] = []
+        for chunk in _chunks(rows, chunk_size):
+            if stmt is not None:
+                created.extend((await db.scalars(stmt, chunk)).all())
+            else:
+                objs = [self.model(**row) for row in chunk]
+                db.add_all(objs)
+                await db.flush()
+                created.extend(objs)
+        await db.commit()
+        if stmt is None:
+            for obj in created:
+                await db.refresh(obj)
+        return created
+
+    async def update_many_async(
+        self, db: AsyncSession, *, updates: Sequence[Dict[str, Any]], chunk_size: int = 500
+    ) -> int:
+        for chunk in _chunks(list(updates), chunk_size):
+            await db.execute(update(self.model), chunk)
+        await db.commit()
+        return len(updates)
+
+    async def upsert_many_async(
+        self,
+        db: AsyncSession,
+        *,
+        rows: Sequence[Dict[str, Any]],
+        index_elements: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+        chunk_size: int = 500
+    ) -> List[ModelType]:
+        rows = list(rows)
+        if not rows:
+            return []
+        stmt = self._upsert_many_stmt(
+            db.get_bind().dialect.name, rows, index_elements, update_columns
+        )
+        result: List[ModelType] = []
+        for chunk in _chunks(rows, chunk_size):
+            result.extend((await db.scalars(
+                stmt, chunk, execution_options={"populate_existing": True}
+            )).all())
+        await db.commit()
+        return result
@@ -0,0 +1,45 @@
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.config_version import ConfigVersion
+
+class CRUDConfigVersion:
+    def get_version(self, db: Session, *, name: str) -> int:
+        return db.execute(
+            select(ConfigVersion.version).filter(ConfigVersion.name == name)
+        ).scalar() or 0
+
+    async def get_version_async(self, db: AsyncSession, *, name: str) -> int:
+        result = await db.execute(
+            select(ConfigVersion.version).filter(ConfigVersion.name == name)
+        )
+        return result.scalar() or 0
+
+    def set_version(self, db: Session, *, name: str, version: int) -> None:
+        """Store an explicit version, the caller must hold off concurrent writers"""
+        stmt = update(ConfigVersion).where(ConfigVersion.name == name).values(version=version)
+        if db.execute(stmt).rowcount == 0:
+            db.add(ConfigVersion(name=name, version=version))
+        db.commit()
+
+    async def bump_async(self, db: AsyncSession, *, name: str) -> int:
+        """Atomically increment a version, creating it on first use"""
+        stmt = (
+            update(ConfigVersion)
+            .where(ConfigVersion.name == name)
+            .values(version=ConfigVersion.version + 1)
+        )
+        if (await db.execute(stmt)).rowcount == 0:
+            db.add(ConfigVersion(name=name, version=1))
+            try:
+                await db.commit()
+                return 1
+            except IntegrityError:
+                # Another worker created it first
+                await db.rollback()
+                await db.execute(stmt)
+        await db.commit()
+        return await self.get_version_async(db, name=name)
+
+config_version = CRUDConfigVersion()
@@ -1,4 +1,6 @@
 from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
 from app.models.model import Model
@@ -22,4 +24,12 @@ class CRUDModel(CRUDBase[Model, ModelCreate, ModelUpdate]):
             Model.is_active == True
         ).order_by(Model.priority.desc()).all()
 
+    async def get_by_name_async(self, db: AsyncSession, *, name: str) -> Optional[Model]:
+        result = await db.execute(select(Model).filter(Model.name == name))
+        return result.scalars().first()
+
+    async def get_active_models_async(self, db: AsyncSession) -> List[Model]:
+        result = await db.execute(select(Model).filter(Model.is_active == True))
+        return result.scalars().all()
+
 model = CRUDModel(Model)
\ No newline at end of file
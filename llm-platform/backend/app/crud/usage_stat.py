@@ -0,0 +1,115 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func, select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.crud.base import CRUDBase
+from app.models.access_log import AccessLog
+from app.models.usage_stat import UsageStat
+
+# Counters summed into a (user_id, model_id, date) rollup row
+ROLLUP_COLUMNS = (
+    "request_count", "prompt_tokens", "completion_tokens", "total_tokens", "total_latency_ms"
+)
+
+def aggregate_log_rows(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold access log rows into per (user, model, date) counter deltas"""
+    buckets: Dict[Tuple[int, int, date], Dict[str, Any]] = {}
+    for row in rows:
+        created_at = row.get("created_at") or datetime.utcnow()
+        key = (row["user_id"], row["model_id"], created_at.date())
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {
+                "user_id": key[0], "model_id": key[1], "date": key[2],
+                **{column: 0 for column in ROLLUP_COLUMNS}
+            }
+        bucket["request_count"] += 1
+        bucket["prompt_tokens"] += row.get("prompt_tokens") or 0
+        bucket["completion_tokens"] += row.get("completion_tokens") or 0
+        bucket["total_tokens"] += row.get("total_tokens") or 0
+        bucket["total_latency_ms"] += row.get("latency_ms") or 0
+    return list(buckets.values())
+
+class CRUDUsageStat(CRUDBase[UsageStat, dict, dict]):
+    def _upsert(self, dialect_name: str):
+        """INSERT ... ON CONFLICT that adds the deltas onto an existing rollup row"""
+        stmt = self._dialect_insert(dialect_name)
+        return stmt.on_conflict_do_update(
+            index_elements=["user_id", "model_id", "date"],
+            set_={
+                **{
+                    column: func.coalesce(getattr(UsageStat, column), 0) + getattr(stmt.excluded, column)
+                    for column in ROLLUP_COLUMNS
+                },
+                "updated_at": func.now()
+            }
+        )
+
+    def add_usage(self, db: Session, *, deltas: List[Dict[str, Any]]) -> None:
+        """Apply rollup deltas in one executemany, the caller commits"""
+        if deltas:
+            db.execute(self._upsert(db.get_bind().dialect.name), deltas)
+
+    async def add_usage_async(self, db: AsyncSession, *, deltas: List[Dict[str, Any]]) -> None:
+        if deltas:
+            await db.execute(self._upsert(db.get_bind().dialect.name), deltas)
+
+    def rebuild(
+        self,
+        db: Session,
+        *,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        batch_size: int = 5000
+    ) -> int:
+        """Recompute rollup rows between two dates from access_logs, returns logs read.
+
+        The range defaults to the days access_logs still covers. Rollups of
+        days already archived out of access_logs are left alone, since they
+        can no longer be recomputed.
+        """
+        if start_date is None or end_date is None:
+            first, last = db.execute(
+                select(func.min(AccessLog.created_at), func.max(AccessLog.created_at))
+            ).one()
+            if first is None:
+                return 0
+            start_date = start_date or first.date()
+            end_date = end_date or last.date()
+        db.execute(delete(UsageStat).where(
+            UsageStat.date >= start_date, UsageStat.date <= end_date
+        ))
+        query = select(
+            AccessLog.user_id, AccessLog.model_id, AccessLog.created_at,
+            AccessLog.prompt_tokens, AccessLog.completion_tokens,
+            AccessLog.total_tokens, AccessLog.latency_ms
+        ).where(
+            AccessLog.created_at >= datetime.combine(start_date, time.min),
+            AccessLog.created_at < datetime.combine(end_date + timedelta(days=1), time.min)
+        ).execution_options(yield_per=batch_size)
+        total = 0
+        for rows in db.execute(query).mappings().partitions():
+            self.add_usage(db, deltas=aggregate_log_rows(rows))
+            total += len(rows)
+        db.commit()
+        return total
+
+    async def get_daily_async(
+        self, db: AsyncSession, *, start_date: date, end_date: date, user_id: Optional[int] = None
+    ):
+        """Per-day totals across models, read from rollups only"""
+        query = select(
+            UsageStat.date.label('date'),
+            func.sum(UsageStat.request_count).label('request_count'),
+            func.sum(UsageStat.total_tokens).label('total_tokens'),
+            func.sum(UsageStat.total_latency_ms).label('total_latency_ms'),
+        ).filter(UsageStat.date >= start_date, UsageStat.date <= end_date)
+
+        if user_id:
+            query = query.filter(UsageStat.user_id == user_id)
+
+        result = await db.execute(query.group_by(UsageStat.date).order_by(UsageStat.date))
+        return result.all()
+
+usage_stat = CRUDUsageStat(UsageStat)
@@ -1,10 +1,25 @@
-from typing import Optional
+from typing import List, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import get_password_hash, verify_password
 
+# bcrypt releases the GIL, so bulk hashing scales with threads
+PASSWORD_HASH_WORKERS = min(32, os.cpu_count() or 4)
+
+def hash_passwords(passwords: Sequence[str]) -> List[str]:
+    """Hash many passwords in parallel across a thread pool"""
+    if len(passwords) <= 1:
+        return [get_password_hash(p) for p in passwords]
+    with ThreadPoolExecutor(max_workers=min(PASSWORD_HASH_WORKERS, len(passwords))) as pool:
+        return list(pool.map(get_password_hash, passwords))
+
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
@@ -13,19 +28,36 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         return db.query(User).filter(User.username == username).first()
 
     def create(self, db: Session, *, obj_in: UserCreate) -> User:
-        db_obj = User(
-            username=obj_in.username,
-            email=obj_in.email,
-            password_hash=get_password_hash(obj_in.password),
-            full_name=obj_in.full_name,
-            description=obj_in.description,
-            role=obj_in.role,
-            is_active=obj_in.is_active,
+        rows = self._user_rows([obj_in], [get_password_hash(obj_in.password)])
+        return self._insert_rows(db, rows)[0]
+
+    def _user_rows(self, objs_in: Sequence[UserCreate], hashes: List[str]) -> List[dict]:
+        return [
+            {
+                "username": obj_in.username,
+                "email": obj_in.email,
+                "password_hash": password_hash,
+                "full_name": obj_in.full_name,
+                "description": obj_in.description,
+                "role": obj_in.role,
+                "is_active": obj_in.is_active,
+            }
+            for obj_in, password_hash in zip(objs_in, hashes)
+        ]
+
+    def create_many(
+        self, db: Session, *, objs_in: Sequence[UserCreate], chunk_size: int = 500
+    ) -> List[User]:
+        hashes = hash_passwords([o.password for o in objs_in])
+        return self._insert_rows(db, self._user_rows(objs_in, hashes), chunk_size=chunk_size)
+
+    async def create_many_async(
+        self, db: AsyncSession, *, objs_in: Sequence[UserCreate], chunk_size: int = 500
+    ) -> List[User]:
+        hashes = await asyncio.to_thread(hash_passwords, [o.password for o in objs_in])
+        return await self._insert_rows_async(
+            db, self._user_rows(objs_in, hashes), chunk_size=chunk_size
         )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
 
     def update(self, db: Session, *, db_obj: User, obj_in: UserUpdate) -> User:
         update_data = obj_in.dict(exclude_unset=True)
@@ -43,6 +75,37 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             return None
         return user
 
+    async def get_by_email_async(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        result = await db.execute(select(User).filter(User.email == email))
+        return result.scalars().first()
+
+    async def get_by_username_async(self, db: AsyncSession, *, username: str) -> Optional[User]:
+        result = await db.execute(select(User).filter(User.username == username))
+        return result.scalars().first()
+
+    async def create_async(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        # bcrypt is CPU bound, keep it off the event loop
+        password_hash = await asyncio.to_thread(get_password_hash, obj_in.password)
+        return (await self._insert_rows_async(db, self._user_rows([obj_in], [password_hash])))[0]
+
+    async def update_async(self, db: AsyncSession, *, db_obj: User, obj_in: UserUpdate) -> User:
+        update_data = obj_in.dict(exclude_unset=True)
+        if "password" in update_data:
+            hashed_password = await asyncio.to_thread(get_password_hash, update_data["password"])
+            del update_data["password"]
+            update_data["password_hash"] = hashed_password
+        return await super().update_async(db, db_obj=db_obj, obj_in=update_data)
+
+    async def authenticate_async(
+        self, db: AsyncSession, *, username: str, password: str
+    ) -> Optional[User]:
+        user = await self.get_by_username_async(db, username=username)
+        if not user:
+            return None
+        if not await asyncio.to_thread(verify_password, password, user.password_hash):
+            return None
+        return user
+
     def is_active(self, user: User) -> bool:
         return user.is_active
 
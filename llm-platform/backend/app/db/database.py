@@ -1,14 +1,51 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
 engine = create_engine(
-    settings.DATABASE_URL, 
+    settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL to its async driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2:", "postgresql:", "postgres:"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg:" + url[len(prefix):]
+    return url
+
+# Async engine used by the request path so queries do not block the event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or _async_database_url(settings.DATABASE_URL)
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+def _read_database_url() -> str:
+    if settings.READ_DATABASE_URL:
+        return _async_database_url(settings.READ_DATABASE_URL)
+    return settings.ASYNC_DATABASE_URL or _async_database_url(settings.DATABASE_URL)
+
+# Read-only engine for admin analytics, capped so heavy scans queue on their
+# own pool instead of competing with chat traffic for connections
+read_engine = create_async_engine(
+    _read_database_url(),
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.READ_DB_POOL_SIZE,
+    max_overflow=settings.READ_DB_MAX_OVERFLOW,
+    pool_timeout=settings.READ_DB_POOL_TIMEOUT_SECONDS
+)
+ReadSessionLocal = async_sessionmaker(
+    bind=read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -16,4 +53,13 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    """Session for read-only queries that tolerate replica lag"""
+    async with ReadSessionLocal() as db:
+        yield db
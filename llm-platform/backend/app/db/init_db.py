@@ -1,36 +1,103 @@
+from contextlib import contextmanager
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
+from app.db.database import Base, SessionLocal, engine
+from app.crud.config_version import config_version
 from app.crud.user import user
 from app.crud.model import model
+from app.crud.usage_stat import usage_stat
+from app.models.access_log import AccessLog
+from app.models.usage_stat import UsageStat
+from app.models.user import User
+from app.models.model import Model
 from app.schemas.user import UserCreate
 from app.schemas.model import ModelCreate
+import hashlib
 import logging
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows, where workers are not forked from one master
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
-def init_db() -> None:
-    """Initialize database with default data"""
+# Bump whenever tables, indexes, upgrades or default data change, so the
+# next start runs create_all and init_db once before marking it current
+SCHEMA_VERSION = 3
+SCHEMA_VERSION_NAME = "schema"
+
+# Arbitrary key for the PostgreSQL advisory lock held while initializing
+INIT_LOCK_KEY = 7305121
+
+def upgrade_usage_stats(db: Session) -> None:
+    """Recreate usage_stats from access_logs if it predates the rollup columns.
+
+    The table only holds derived data, so it is rebuilt instead of migrated.
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns(UsageStat.__tablename__)}
+    if "total_latency_ms" in columns:
+        return
+    UsageStat.__table__.drop(bind=engine)
+    UsageStat.__table__.create(bind=engine)
+    rebuilt = usage_stat.rebuild(db)
+    logger.info(f"Rebuilt usage_stats rollups from {rebuilt} access logs")
+
+# Columns added to access_logs after it was first created, with their DDL
+ACCESS_LOG_COLUMNS = {
+    "cache_hit": "BOOLEAN DEFAULT FALSE",
+    "coalesced": "BOOLEAN DEFAULT FALSE",
+}
+
+def upgrade_access_logs() -> None:
+    """Add columns introduced after access_logs was first created"""
+    columns = {c["name"] for c in inspect(engine).get_columns(AccessLog.__tablename__)}
+    for name, ddl in ACCESS_LOG_COLUMNS.items():
+        if name not in columns:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE access_logs ADD COLUMN {name} {ddl}"))
+            logger.info(f"Added access_logs.{name}")
+
+# Single-column indexes now covered by the leading column of a composite index
+REDUNDANT_INDEXES = (
+    "ix_access_logs_user_id",
+    "ix_access_logs_model_id",
+    "ix_access_logs_api_key_id",
+    "ix_api_keys_user_id",
+)
+
+def ensure_indexes() -> None:
+    """Create indexes added to existing tables, which create_all skips"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        for name in REDUNDANT_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+def init_db() -> bool:
+    """Initialize database with default data, returns False if it failed"""
     db = SessionLocal()
     
     try:
-        # Create default admin user
-        admin_user = user.get_by_username(db, username="admin")
-        if not admin_user:
-            admin_user_in = UserCreate(
+        ensure_indexes()
+        upgrade_access_logs()
+        upgrade_usage_stats(db)
+        
+        # Create default users that are missing, hashed in parallel, one INSERT
+        default_users = [
+            UserCreate(
                 username="admin",
                 email="admin@llm-platform.com",
                 password="admin123",
                 full_name="System Administrator",
                 role="admin",
                 is_active=True
-            )
-            admin_user = user.create(db, obj_in=admin_user_in)
-            logger.info("Created default admin user")
-        
-        # Create default demo user
-        demo_user = user.get_by_username(db, username="demo")
-        if not demo_user:
-            demo_user_in = UserCreate(
+            ),
+            UserCreate(
                 username="demo",
                 email="demo@llm-platform.com",
                 password="demo123",
@@ -38,8 +105,13 @@ def init_db() -> None:
                 role="user",
                 is_active=True
             )
-            demo_user = user.create(db, obj_in=demo_user_in)
-            logger.info("Created default demo user")
+        ]
+        existing_users = set(db.execute(
+            select(User.username).filter(User.username.in_([u.username for u in default_users]))
+        ).scalars())
+        new_users = [u for u in default_users if u.username not in existing_users]
+        for created_user in user.create_many(db, objs_in=new_users):
+            logger.info(f"Created default user: {created_user.username}")
         
         # Create default models
         default_models = [
@@ -51,7 +123,7 @@ def init_db() -> None:
                 "description": "最先进的GPT-4模型，具备强大的推理和创作能力",
                 "max_tokens": 8192,
                 "priority": 100,
-                "metadata": {
+                "model_metadata": {
                     "context_length": 8192,
                     "training_data_cutoff": "2024-04",
                     "capabilities": ["chat", "reasoning", "coding", "analysis"]
@@ -65,7 +137,7 @@ def init_db() -> None:
                 "description": "快速高效的GPT-3.5模型，适合大部分对话任务",
                 "max_tokens": 4096,
                 "priority": 80,
-                "metadata": {
+                "model_metadata": {
                     "context_length": 4096,
                     "training_data_cutoff": "2024-01",
                     "capabilities": ["chat", "coding", "writing"]
@@ -79,7 +151,7 @@ def init_db() -> None:
                 "description": "专门优化的编程AI模型，擅长代码生成和调试",
                 "max_tokens": 4096,
                 "priority": 90,
-                "metadata": {
+                "model_metadata": {
                     "context_length": 16384,
                     "specialization": "coding",
                     "capabilities": ["coding", "debugging", "code_review"]
@@ -93,7 +165,7 @@ def init_db() -> None:
                 "description": "通用对话AI模型，支持中英文对话",
                 "max_tokens": 4096,
                 "priority": 70,
-                "metadata": {
+                "model_metadata": {
                     "context_length": 32768,
                     "languages": ["chinese", "english"],
                     "capabilities": ["chat", "reasoning", "writing"]
@@ -107,7 +179,7 @@ def init_db() -> None:
                 "description": "Anthropic的Claude 3模型，注重安全和有用性",
                 "max_tokens": 4096,
                 "priority": 85,
-                "metadata": {
+                "model_metadata": {
                     "context_length": 200000,
                     "safety_focus": True,
                     "capabilities": ["chat", "analysis", "writing", "reasoning"]
@@ -115,17 +187,82 @@ def init_db() -> None:
             }
         ]
         
-        for model_data in default_models:
-            existing_model = model.get_by_name(db, name=model_data["name"])
-            if not existing_model:
-                model_in = ModelCreate(**model_data)
-                model.create(db, obj_in=model_in)
-                logger.info(f"Created default model: {model_data['name']}")
+        existing_models = set(db.execute(
+            select(Model.name).filter(Model.name.in_([m["name"] for m in default_models]))
+        ).scalars())
+        new_models = [
+            ModelCreate(**model_data)
+            for model_data in default_models
+            if model_data["name"] not in existing_models
+        ]
+        for created_model in model.create_many(db, objs_in=new_models):
+            logger.info(f"Created default model: {created_model.name}")
         
         logger.info("Database initialization completed")
+        return True
         
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
         db.rollback()
+        return False
+    finally:
+        db.close()
+
+def schema_is_current() -> bool:
+    """One lookup of the schema marker, False if it or its table is missing"""
+    db = SessionLocal()
+    try:
+        return config_version.get_version(db, name=SCHEMA_VERSION_NAME) == SCHEMA_VERSION
+    except SQLAlchemyError:
+        return False
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@contextmanager
+def _init_lock():
+    """Serialize initialization across workers starting at the same time"""
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": INIT_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": INIT_LOCK_KEY})
+        return
+    # SQLite and others: workers share a host, so a lock file in the temp
+    # directory named after the database keeps the source tree clean
+    if fcntl is None:
+        yield
+        return
+    database = engine.url.database or ""
+    if database != ":memory:":
+        database = os.path.abspath(database)
+    digest = hashlib.sha1(database.encode()).hexdigest()[:12]
+    path = os.path.join(tempfile.gettempdir(), f"llm_platform-{digest}.init.lock")
+    with open(path, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def prepare_db() -> bool:
+    """Create tables and seed unless the schema marker is current.
+
+    Warm starts cost a single query. On a cold start one worker initializes
+    while the others wait on the lock and then find the marker set. Returns
+    True if this process ran the initialization.
+    """
+    if schema_is_current():
+        return False
+    with _init_lock():
+        if schema_is_current():
+            return False
+        Base.metadata.create_all(bind=engine)
+        if init_db():
+            db = SessionLocal()
+            try:
+                config_version.set_version(db, name=SCHEMA_VERSION_NAME, version=SCHEMA_VERSION)
+            finally:
+                db.close()
+        return True
\ No newline at end of file
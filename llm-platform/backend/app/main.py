@@ -5,9 +5,16 @@ from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.api.v1.api import api_router
-from app.db.database import engine
+from app.db.database import async_engine, read_engine
 from app.models import *  # Import all models
-from app.db.init_db import init_db
+from app.db.init_db import prepare_db
+from app.services.usage_tracker import usage_tracker
+from app.services.access_log_writer import access_log_writer
+from app.services.log_archiver import log_archiver
+from app.services.model_registry import model_registry
+from app.services.upstream_clients import upstream_clients
+from app.middleware.auth import principal_cache_sync
+from app.middleware.rate_limit import rate_limiter
 import time
 import logging
 
@@ -20,20 +27,44 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     logger.info("Starting LLM Platform...")
+    started = time.perf_counter()
     
-    # Create database tables
-    from app.db.database import Base
-    Base.metadata.create_all(bind=engine)
+    # Create tables and default data only when the schema marker is behind
+    initialized = prepare_db()
+    db_ready = time.perf_counter()
     
-    # Initialize database with default data
-    init_db()
+    # Load models once, then follow admin changes by version polling
+    model_registry.load()
+    model_registry.start()
     
-    logger.info("LLM Platform started successfully")
+    # Clear cached principals when another worker revokes a key or user
+    principal_cache_sync.start()
+    
+    # Start background flushing of buffered API key usage
+    usage_tracker.start()
+    access_log_writer.start()
+    log_archiver.start()
+    
+    ready = time.perf_counter()
+    logger.info(
+        f"LLM Platform started successfully in {(ready - started) * 1000:.0f} ms "
+        f"(database {'initialized' if initialized else 'current, init skipped'} "
+        f"in {(db_ready - started) * 1000:.0f} ms)"
+    )
     
     yield
     
     # Shutdown
     logger.info("Shutting down LLM Platform...")
+    await model_registry.stop()
+    await principal_cache_sync.stop()
+    await log_archiver.stop()
+    await usage_tracker.stop()
+    await access_log_writer.stop()
+    await rate_limiter.close()
+    await upstream_clients.aclose()
+    await read_engine.dispose()
+    await async_engine.dispose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -1,4 +1,4 @@
-from .auth import get_current_user, get_current_api_key
+from .auth import get_current_user, get_current_api_key, principal_cache
 from .rate_limit import rate_limiter
 
-__all__ = ["get_current_user", "get_current_api_key", "rate_limiter"]
\ No newline at end of file
+__all__ = ["get_current_user", "get_current_api_key", "principal_cache", "rate_limiter"]
\ No newline at end of file
@@ -1,19 +1,144 @@
-from typing import Optional
+from typing import Any, Dict, Optional
+from dataclasses import dataclass
+import asyncio
+import logging
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.core.security import verify_token
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from app.db.database import AsyncSessionLocal, get_async_db
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import verify_token, hash_api_key
+from app.crud.config_version import config_version
 from app.crud.user import user
 from app.crud.api_key import api_key
 from app.models.user import User
 from app.models.api_key import APIKey
+from app.services.usage_tracker import usage_tracker
+
+logger = logging.getLogger(__name__)
 
 security = HTTPBearer(auto_error=False)
 
+AUTH_VERSION_NAME = "auth"
+
+@dataclass(frozen=True)
+class Principal:
+    """Resolved identity behind a credential, stored as column snapshots"""
+    user: Dict[str, Any]
+    api_key: Optional[Dict[str, Any]] = None
+
+    @property
+    def user_id(self) -> int:
+        return self.user["id"]
+
+    @property
+    def api_key_id(self) -> Optional[int]:
+        return self.api_key["id"] if self.api_key else None
+
+# Credential fingerprint -> Principal
+principal_cache = TTLCache(
+    maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+
+def _snapshot(obj) -> Dict[str, Any]:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+def _restore(model, values: Dict[str, Any]):
+    """Build a per-request detached instance so it can still be added to a session"""
+    obj = model(**values)
+    make_transient_to_detached(obj)
+    return obj
+
+class PrincipalCacheSync:
+    """Propagates principal invalidations to every worker.
+
+    Invalidating drops the entries in this process and bumps the 'auth' row
+    in config_versions. Every worker polls that row and clears its whole
+    principal cache when it moved, so a revoked key or disabled user stops
+    authenticating everywhere within poll_interval rather than the cache TTL.
+    """
+
+    def __init__(self, poll_interval: float = 2.0):
+        self.poll_interval = poll_interval
+        self.version = -1
+        self.clears = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def bump(self, db: AsyncSession) -> None:
+        version = await config_version.bump_async(db, name=AUTH_VERSION_NAME)
+        if version == self.version + 1:
+            # Only our own change, already applied here
+            self.version = version
+
+    async def refresh_if_changed(self) -> bool:
+        async with AsyncSessionLocal() as db:
+            version = await config_version.get_version_async(db, name=AUTH_VERSION_NAME)
+        if version == self.version:
+            return False
+        self.version = version
+        principal_cache.clear()
+        self.clears += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_if_changed()
+            except Exception as e:
+                logger.error(f"Error polling auth cache version: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "clears": self.clears,
+            "poll_interval_seconds": self.poll_interval
+        }
+
+# Global principal cache sync instance
+principal_cache_sync = PrincipalCacheSync(poll_interval=settings.AUTH_CACHE_SYNC_POLL_SECONDS)
+
+async def invalidate_user(db: AsyncSession, user_id: int) -> int:
+    """Drop cached principals of a user and all of their API keys, on every worker"""
+    dropped = principal_cache.discard_where(lambda p: p.user_id == user_id)
+    await principal_cache_sync.bump(db)
+    return dropped
+
+async def invalidate_api_key(db: AsyncSession, api_key_id: int) -> int:
+    """Drop cached principals resolved from an API key, on every worker"""
+    dropped = principal_cache.discard_where(lambda p: p.api_key_id == api_key_id)
+    await principal_cache_sync.bump(db)
+    return dropped
+
+def _jwt_api_key(db_user: User) -> APIKey:
+    # Create a temporary API key object for JWT auth
+    return APIKey(
+        id=0,
+        user_id=db_user.id,
+        name="JWT Token",
+        key_prefix="jwt_",
+        is_active=True
+    )
+
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get current user from JWT token"""
     if not credentials:
@@ -33,7 +158,12 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    db_user = user.get_by_username(db, username=username)
+    fingerprint = hash_api_key(token)
+    principal = principal_cache.get(fingerprint)
+    if principal is not None:
+        return _restore(User, principal.user)
+    
+    db_user = await user.get_by_username_async(db, username=username)
     if db_user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -46,11 +176,12 @@ async def get_current_user(
             detail="Inactive user"
         )
     
+    principal_cache.set(fingerprint, Principal(user=_snapshot(db_user)))
     return db_user
 
 async def get_current_api_key(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> tuple[APIKey, User]:
     """Get current API key and associated user"""
     auth_header = request.headers.get("Authorization")
@@ -69,34 +200,44 @@ async def get_current_api_key(
         )
     
     token = auth_header[7:]  # Remove "Bearer " prefix
+    fingerprint = hash_api_key(token)
+    
+    principal = principal_cache.get(fingerprint)
+    if principal is not None:
+        if principal.api_key is not None:
+            usage_tracker.record(principal.api_key_id)
+            return _restore(APIKey, principal.api_key), _restore(User, principal.user)
+        # JWT principals are only reused while the token itself is valid
+        if verify_token(token):
+            db_user = _restore(User, principal.user)
+            return _jwt_api_key(db_user), db_user
+        principal_cache.pop(fingerprint)
     
     # Try to verify as API key first
-    db_api_key = api_key.verify_key(db, api_key=token)
+    db_api_key = await api_key.verify_key_async(db, api_key=token)
     
     if db_api_key:
         # Get the user associated with this API key
-        db_user = user.get(db, id=db_api_key.user_id)
+        db_user = await user.get_async(db, id=db_api_key.user_id)
         if not db_user or not user.is_active(db_user):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found or inactive",
             )
+        principal_cache.set(
+            fingerprint,
+            Principal(user=_snapshot(db_user), api_key=_snapshot(db_api_key))
+        )
+        usage_tracker.record(db_api_key.id)
         return db_api_key, db_user
     
     # If not an API key, try as JWT token
     username = verify_token(token)
     if username:
-        db_user = user.get_by_username(db, username=username)
+        db_user = await user.get_by_username_async(db, username=username)
         if db_user and user.is_active(db_user):
-            # Create a temporary API key object for JWT auth
-            temp_api_key = APIKey(
-                id=0,
-                user_id=db_user.id,
-                name="JWT Token",
-                key_prefix="jwt_",
-                is_active=True
-            )
-            return temp_api_key, db_user
+            principal_cache.set(fingerprint, Principal(user=_snapshot(db_user)))
+            return _jwt_api_key(db_user), db_user
     
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
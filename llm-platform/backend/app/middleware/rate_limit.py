@@ -1,97 +1,473 @@
-from typing import Dict, Optional
+from typing import Any, Dict, List, NamedTuple, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from fastapi import HTTPException, Request, status
+import hashlib
+import logging
+import math
 import time
-import asyncio
-from collections import defaultdict, deque
 from app.core.config import settings
 
-class InMemoryRateLimiter:
-    """Simple in-memory rate limiter"""
-    
-    def __init__(self):
-        self.requests: Dict[str, deque] = defaultdict(deque)
-        self.lock = asyncio.Lock()
-    
+logger = logging.getLogger(__name__)
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_at: float  # Epoch seconds when the full burst is available again
+    retry_after: float  # Seconds until the next request would be allowed
+
+class RateLimitCheck(NamedTuple):
+    key: str
+    limit: Optional[int] = None
+    period: Optional[float] = None
+    burst: Optional[int] = None
+    cost: int = 1
+    force: bool = False
+
+def _remaining(now: float, tat: float, interval: float, burst: int) -> int:
+    """Requests that could still be made at ``now`` given the stored TAT"""
+    # Small epsilon so float error does not round a whole slot away
+    return min(burst, max(0, int((now + interval * burst - tat) / interval + 1e-6)))
+
+class RateLimitBackend(ABC):
+    """Storage engine behind check_rate_limit"""
+
+    name = "base"
+
+    def _params(self, limit: Optional[int], period: Optional[float], burst: Optional[int]):
+        if limit is None:
+            limit = settings.RATE_LIMIT_PER_MINUTE
+        if period is None:
+            period = settings.RATE_LIMIT_WINDOW or 60
+        if burst is None:
+            burst = settings.RATE_LIMIT_BURST or limit
+        return limit, period, burst, period / limit
+
+    @abstractmethod
+    async def check(
+        self,
+        key: str,
+        limit: int = None,
+        period: float = None,
+        burst: int = None,
+        cost: int = 1,
+        force: bool = False
+    ) -> RateLimitResult:
+        """Consume ``cost`` units for key and report allowed/remaining/reset.
+
+        With ``force`` the units are consumed even past the burst, for
+        charging usage that has already happened.
+        """
+        pass
+
+    async def check_many(self, checks: List[RateLimitCheck]) -> List[RateLimitResult]:
+        """Run several independent checks, in one round trip where supported"""
+        return [await self.check(*c) for c in checks]
+
+    async def refund(
+        self,
+        key: str,
+        limit: int = None,
+        period: float = None,
+        burst: int = None,
+        cost: int = 1
+    ) -> None:
+        """Give back units consumed by an earlier check"""
+        # A negative cost moves the TAT back; it is never pushed below now
+        await self.check(key, limit, period, burst, -cost, True)
+
     async def is_allowed(
-        self, 
-        key: str, 
-        limit: int = None, 
+        self,
+        key: str,
+        limit: int = None,
         window: int = 60
     ) -> bool:
         """Check if request is allowed based on rate limit"""
-        if limit is None:
-            limit = settings.RATE_LIMIT_PER_MINUTE
-            
-        current_time = time.time()
-        window_start = current_time - window
-        
-        async with self.lock:
-            # Clean old requests
-            request_times = self.requests[key]
-            while request_times and request_times[0] < window_start:
-                request_times.popleft()
-            
-            # Check if limit exceeded
-            if len(request_times) >= limit:
-                return False
-            
-            # Add current request
-            request_times.append(current_time)
-            return True
-    
+        result = await self.check(key, limit=limit, period=window)
+        return result.allowed
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    async def close(self) -> None:
+        pass
+
+class GCRARateLimiter(RateLimitBackend):
+    """In-memory rate limiter using the generic cell rate algorithm.
+
+    Each key stores a single theoretical arrival time (TAT) on the
+    monotonic clock. ``limit`` requests per ``period`` is the sustained
+    rate and ``burst`` is how many requests may arrive back to back.
+
+    There is no lock: a check never awaits, so it runs to completion on the
+    event loop without interleaving with other checks.
+
+    Keys are kept in LRU order. A key whose TAT has passed is
+    indistinguishable from a new one, so each check also drops a few idle
+    keys from the cold end; past ``max_keys`` the least recently used key
+    is spilled even if it is still limited.
+    """
+
+    name = "memory"
+
+    # Idle keys examined per check for amortized eviction
+    EVICT_BATCH = 2
+
+    def __init__(self, max_keys: int = None):
+        self.tats: "OrderedDict[str, float]" = OrderedDict()
+        self.max_keys = max_keys or settings.RATE_LIMIT_MAX_KEYS
+        self.evicted_keys = 0
+        self.spilled_keys = 0
+
+    async def check(
+        self,
+        key: str,
+        limit: int = None,
+        period: float = None,
+        burst: int = None,
+        cost: int = 1,
+        force: bool = False
+    ) -> RateLimitResult:
+        limit, period, burst, interval = self._params(limit, period, burst)
+        now = time.monotonic()
+        wall = time.time()
+
+        tat = max(self.tats.get(key, now), now)
+        new_tat = tat + interval * cost
+        allow_at = new_tat - interval * burst
+
+        if now < allow_at and not force:
+            if key in self.tats:
+                self.tats.move_to_end(key)
+            remaining = _remaining(now, tat, interval, burst)
+            return RateLimitResult(
+                False, limit, remaining, wall + tat - now, allow_at - now
+            )
+
+        self.tats[key] = new_tat
+        self.tats.move_to_end(key)
+        self._evict(now)
+        remaining = _remaining(now, new_tat, interval, burst)
+        return RateLimitResult(
+            True, limit, remaining, wall + max(new_tat, now) - now, 0.0
+        )
+
+    def _evict(self, now: float) -> None:
+        tats = self.tats
+        for _ in range(self.EVICT_BATCH):
+            if not tats:
+                return
+            oldest_key = next(iter(tats))
+            if tats[oldest_key] > now:
+                break
+            del tats[oldest_key]
+            self.evicted_keys += 1
+        while len(tats) > self.max_keys:
+            tats.popitem(last=False)
+            self.spilled_keys += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "tracked_keys": len(self.tats),
+            "max_keys": self.max_keys,
+            "evicted_keys": self.evicted_keys,
+            "spilled_keys": self.spilled_keys
+        }
+
     async def get_remaining(
-        self, 
-        key: str, 
-        limit: int = None, 
+        self,
+        key: str,
+        limit: int = None,
         window: int = 60
     ) -> int:
-        """Get remaining requests in current window"""
-        if limit is None:
-            limit = settings.RATE_LIMIT_PER_MINUTE
-            
-        current_time = time.time()
-        window_start = current_time - window
-        
-        async with self.lock:
-            request_times = self.requests[key]
-            # Count requests in current window
-            current_requests = sum(1 for t in request_times if t >= window_start)
-            return max(0, limit - current_requests)
+        """Get remaining requests without consuming any"""
+        limit, period, burst, interval = self._params(limit, window, None)
+        now = time.monotonic()
+        return _remaining(now, max(self.tats.get(key, now), now), interval, burst)
+
+# GCRA with the clock taken from the Redis server so all workers agree.
+# Times are integer microseconds; the key expires once its TAT has passed.
+GCRA_LUA = """
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local force = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval * cost
+local allow_at = new_tat - interval * burst
+if now < allow_at and force == 0 then
+    local remaining = math.floor((now + interval * burst - tat) / interval + 1e-6)
+    return {0, math.max(remaining, 0), math.floor(tat - now), math.ceil(allow_at - now)}
+end
+if new_tat > now then
+    redis.call('SET', KEYS[1], string.format('%.0f', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+else
+    redis.call('DEL', KEYS[1])
+end
+local remaining = math.floor((now + interval * burst - new_tat) / interval + 1e-6)
+return {1, math.min(math.max(remaining, 0), burst), math.max(math.floor(new_tat - now), 0), 0}
+"""
+
+class RedisRateLimiter(RateLimitBackend):
+    """GCRA shared by all workers through an atomic Redis script.
+
+    Each check is one EVALSHA round trip (the script is loaded once per
+    process) and check_many pipelines several checks into one. If Redis is
+    unreachable or slower than RATE_LIMIT_REDIS_TIMEOUT_SECONDS, checks fall
+    back to the in-process limiter so the API keeps serving with per-worker
+    limits.
+    """
+
+    name = "redis"
+
+    # Seconds to stay on the fallback after Redis fails
+    RETRY_INTERVAL = 5.0
+
+    def __init__(self, url: str = None, client=None, prefix: str = "ratelimit:"):
+        if client is None:
+            import redis.asyncio as aioredis
+            # Bounded, so a slow or unreachable Redis hits the fallback
+            # quickly instead of stalling every request
+            timeout = settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS
+            client = aioredis.from_url(
+                url or settings.REDIS_URL,
+                socket_connect_timeout=timeout,
+                socket_timeout=timeout
+            )
+        self.client = client
+        self.prefix = prefix
+        self.sha = hashlib.sha1(GCRA_LUA.encode()).hexdigest()
+        self.script_loaded = False
+        self.fallback = GCRARateLimiter()
+        self.fallback_checks = 0
+        self.retry_at = 0.0  # Skip Redis until then after a failure
+
+    def _args(self, check: RateLimitCheck):
+        limit, period, burst, interval = self._params(check.limit, check.period, check.burst)
+        return limit, (
+            self.prefix + check.key, interval * 1_000_000, burst, check.cost, int(check.force)
+        )
+
+    @staticmethod
+    def _result(limit: int, reply) -> RateLimitResult:
+        allowed, remaining, reset_after, retry_after = (int(v) for v in reply)
+        return RateLimitResult(
+            bool(allowed),
+            limit,
+            remaining,
+            time.time() + reset_after / 1_000_000,
+            retry_after / 1_000_000
+        )
+
+    async def check(
+        self,
+        key: str,
+        limit: int = None,
+        period: float = None,
+        burst: int = None,
+        cost: int = 1,
+        force: bool = False
+    ) -> RateLimitResult:
+        results = await self.check_many([RateLimitCheck(key, limit, period, burst, cost, force)])
+        return results[0]
+
+    async def _evalsha_many(self, prepared) -> list:
+        # EVALSHA directly rather than redis-py Script objects, which add a
+        # SCRIPT EXISTS round trip to every pipeline execution
+        if len(prepared) == 1:
+            return [await self.client.evalsha(self.sha, 1, *prepared[0][1])]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for limit, args in prepared:
+                pipe.evalsha(self.sha, 1, *args)
+            return await pipe.execute()
+
+    async def check_many(self, checks: List[RateLimitCheck]) -> List[RateLimitResult]:
+        from redis.exceptions import NoScriptError
+
+        if time.monotonic() < self.retry_at:
+            self.fallback_checks += len(checks)
+            return await self.fallback.check_many(checks)
+
+        prepared = [self._args(c) for c in checks]
+        try:
+            if not self.script_loaded:
+                await self.client.script_load(GCRA_LUA)
+                self.script_loaded = True
+            try:
+                replies = await self._evalsha_many(prepared)
+            except NoScriptError:
+                # Script cache was flushed, e.g. by a Redis restart
+                await self.client.script_load(GCRA_LUA)
+                replies = await self._evalsha_many(prepared)
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, using in-process fallback: {e}")
+            self.retry_at = time.monotonic() + self.RETRY_INTERVAL
+            self.fallback_checks += len(checks)
+            return await self.fallback.check_many(checks)
+        return [self._result(p[0], reply) for p, reply in zip(prepared, replies)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "fallback_checks": self.fallback_checks,
+            "fallback": self.fallback.stats()
+        }
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+def create_rate_limiter() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimiter()
+    return GCRARateLimiter()
 
 # Global rate limiter instance
-rate_limiter = InMemoryRateLimiter()
+rate_limiter = create_rate_limiter()
 
-async def check_rate_limit(
+def _rate_limit_headers(result: RateLimitResult) -> Dict[str, str]:
+    return {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(math.ceil(result.reset_at))
+    }
+
+def _limit_key(
     request: Request,
     user_id: Optional[int] = None,
     api_key_id: Optional[int] = None
-):
-    """Middleware to check rate limits"""
+) -> str:
     # Create a unique key for rate limiting
     client_ip = request.client.host if request.client else "unknown"
-    
+
     if api_key_id:
-        key = f"api_key_{api_key_id}"
+        return f"api_key_{api_key_id}"
     elif user_id:
-        key = f"user_{user_id}"
-    else:
-        key = f"ip_{client_ip}"
-    
-    if not await rate_limiter.is_allowed(key):
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Rate limit exceeded. Please try again later.",
-            headers={
-                "X-RateLimit-Limit": str(settings.RATE_LIMIT_PER_MINUTE),
-                "X-RateLimit-Remaining": "0",
-                "X-RateLimit-Reset": str(int(time.time()) + 60)
-            }
+        return f"user_{user_id}"
+    return f"ip_{client_ip}"
+
+def _raise_rate_limited(detail: str, headers: Dict[str, str], retry_after: float):
+    headers["Retry-After"] = str(math.ceil(retry_after))
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers=headers
+    )
+
+async def check_rate_limit(
+    request: Request,
+    user_id: Optional[int] = None,
+    api_key_id: Optional[int] = None
+):
+    """Middleware to check rate limits"""
+    key = _limit_key(request, user_id, api_key_id)
+
+    result = await rate_limiter.check(key)
+    if not result.allowed:
+        headers = _rate_limit_headers(result)
+        headers["X-RateLimit-Remaining"] = "0"
+        _raise_rate_limited(
+            "Rate limit exceeded. Please try again later.", headers, result.retry_after
         )
-    
+
     # Add rate limit headers
-    remaining = await rate_limiter.get_remaining(key)
-    request.state.rate_limit_headers = {
-        "X-RateLimit-Limit": str(settings.RATE_LIMIT_PER_MINUTE),
-        "X-RateLimit-Remaining": str(remaining),
-        "X-RateLimit-Reset": str(int(time.time()) + 60)
-    }
\ No newline at end of file
+    request.state.rate_limit_headers = _rate_limit_headers(result)
+
+def estimate_prompt_tokens(messages) -> int:
+    """Rough prompt size: ~4 characters per token plus per-message overhead"""
+    return sum(len(msg.content) // 4 + 4 for msg in messages)
+
+class TokenReservation:
+    """Tokens reserved up front for one completion, settled against usage"""
+
+    def __init__(self, checks: List[RateLimitCheck], reserved: int):
+        self.checks = checks
+        self.reserved = reserved
+        self.settled = False
+
+    async def settle(self, used_tokens: int) -> None:
+        """Refund unused tokens, or charge the overrun, exactly once"""
+        if self.settled:
+            return
+        self.settled = True
+        delta = self.reserved - used_tokens
+        if delta == 0 or not self.checks:
+            return
+        # Forced, so an overrun is charged even when it exceeds the budget
+        await rate_limiter.check_many([
+            check._replace(cost=-delta, force=True) for check in self.checks
+        ])
+
+async def reserve_tokens(
+    request: Request,
+    chat_request,
+    db_model,
+    user_id: Optional[int] = None,
+    api_key_id: Optional[int] = None
+) -> TokenReservation:
+    """Reserve estimated tokens against the per-key and per-model quotas.
+
+    The per-key tokens-per-minute budget comes from TOKEN_RATE_LIMIT_PER_MINUTE.
+    A model can add its own per-key budgets through
+    ``model_metadata["rate_limits"]``, e.g.
+    ``{"requests_per_minute": 20, "tokens_per_minute": 40000}``.
+    """
+    key = _limit_key(request, user_id, api_key_id)
+    estimate = estimate_prompt_tokens(chat_request.messages) + (chat_request.max_tokens or 0)
+    limits = ((db_model.model_metadata or {}).get("rate_limits") or {})
+
+    # Each budget is its own burst: RATE_LIMIT_BURST only applies to the
+    # global request limit and would otherwise cap these budgets
+    token_checks: List[RateLimitCheck] = []
+    request_checks: List[RateLimitCheck] = []
+    if settings.TOKEN_RATE_LIMIT_PER_MINUTE:
+        limit = settings.TOKEN_RATE_LIMIT_PER_MINUTE
+        token_checks.append(RateLimitCheck(f"tokens_{key}", limit, 60, limit, estimate))
+    if limits.get("tokens_per_minute"):
+        limit = limits["tokens_per_minute"]
+        token_checks.append(RateLimitCheck(
+            f"tokens_model_{db_model.id}_{key}", limit, 60, limit, estimate
+        ))
+    if limits.get("requests_per_minute"):
+        limit = limits["requests_per_minute"]
+        request_checks.append(RateLimitCheck(f"model_{db_model.id}_{key}", limit, 60, limit))
+    checks = token_checks + request_checks
+    if not checks:
+        return TokenReservation([], estimate)
+
+    # All quotas in one backend round trip
+    results = await rate_limiter.check_many(checks)
+
+    denied = [(c, r) for c, r in zip(checks, results) if not r.allowed]
+    if denied:
+        # Give back what the other quotas already consumed
+        refunds = [
+            check._replace(cost=-check.cost, force=True)
+            for check, result in zip(checks, results) if result.allowed
+        ]
+        if refunds:
+            await rate_limiter.check_many(refunds)
+        check, result = denied[0]
+        headers = _rate_limit_headers(result)
+        if check in token_checks:
+            headers = {f"{k}-Tokens": v for k, v in headers.items()}
+        _raise_rate_limited(
+            "Token rate limit exceeded. Please try again later."
+            if check in token_checks else
+            f"Rate limit exceeded for model '{db_model.name}'. Please try again later.",
+            headers,
+            result.retry_after
+        )
+
+    if token_checks:
+        # Report the tightest token budget
+        tightest = min(results[:len(token_checks)], key=lambda r: r.remaining)
+        headers = getattr(request.state, "rate_limit_headers", {})
+        headers.update({f"{k}-Tokens": v for k, v in _rate_limit_headers(tightest).items()})
+        request.state.rate_limit_headers = headers
+
+    return TokenReservation(token_checks, estimate)
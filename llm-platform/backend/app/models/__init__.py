@@ -3,5 +3,6 @@ from .api_key import APIKey
 from .model import Model
 from .access_log import AccessLog
 from .usage_stat import UsageStat
+from .config_version import ConfigVersion
 
-__all__ = ["User", "APIKey", "Model", "AccessLog", "UsageStat"]
\ No newline at end of file
+__all__ = ["User", "APIKey", "Model", "AccessLog", "UsageStat", "ConfigVersion"]
\ No newline at end of file
@@ -1,21 +1,30 @@
-from sqlalchemy import Column, Integer, String, DateTime, BigInteger, Text, Float
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, Text, Float, Index, Boolean
+from sqlalchemy.sql import false, func
 from app.db.database import Base
 
 class AccessLog(Base):
     __tablename__ = "access_logs"
+    __table_args__ = (
+        # Equality on the owner column plus a created_at range/order, the
+        # leading column also serves plain lookups by owner
+        Index("ix_access_logs_user_id_created_at", "user_id", "created_at"),
+        Index("ix_access_logs_model_id_created_at", "model_id", "created_at"),
+        Index("ix_access_logs_api_key_id_created_at", "api_key_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=False, index=True)  # Manual FK
-    api_key_id = Column(Integer, nullable=False, index=True)  # Manual FK
-    model_id = Column(Integer, nullable=False, index=True)  # Manual FK
+    user_id = Column(Integer, nullable=False)  # Manual FK
+    api_key_id = Column(Integer, nullable=False)  # Manual FK
+    model_id = Column(Integer, nullable=False)  # Manual FK
     request_type = Column(String(50), nullable=False)  # 'chat', 'completions', 'embeddings'
     status_code = Column(Integer, nullable=False)
     latency_ms = Column(BigInteger, nullable=False)  # Request latency in milliseconds
     prompt_tokens = Column(Integer, default=0)
     completion_tokens = Column(Integer, default=0)
     total_tokens = Column(Integer, default=0)
-    prompt_hash = Column(String(255))  # For caching
+    prompt_hash = Column(String(255))  # Completion cache key, set for cacheable requests
+    cache_hit = Column(Boolean, default=False, server_default=false())  # Served from the completion cache
+    coalesced = Column(Boolean, default=False, server_default=false())  # Shared another request's upstream call
     ip_address = Column(String(45))  # Support IPv6
     user_agent = Column(Text)
     error_message = Column(Text)
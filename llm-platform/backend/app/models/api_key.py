@@ -1,12 +1,16 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, BigInteger
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, BigInteger, Index
 from sqlalchemy.sql import func
 from app.db.database import Base
 
 class APIKey(Base):
     __tablename__ = "api_keys"
+    __table_args__ = (
+        # Per-user lookups and keyset pagination of a user's keys
+        Index("ix_api_keys_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=False, index=True)  # Manual FK
+    user_id = Column(Integer, nullable=False)  # Manual FK
     key_hash = Column(String(255), unique=True, index=True, nullable=False)
     key_prefix = Column(String(10), unique=True, nullable=False)
     name = Column(String(255), nullable=False)  # Key name for identification
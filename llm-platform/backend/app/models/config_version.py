@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class ConfigVersion(Base):
+    __tablename__ = "config_versions"
+    
+    name = Column(String(100), primary_key=True)  # e.g., 'models'
+    version = Column(BigInteger, default=0, nullable=False)  # Bumped on every change, polled by workers
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
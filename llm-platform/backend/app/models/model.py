@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, Index
 from sqlalchemy.sql import func
 from app.db.database import Base
 
 class Model(Base):
     __tablename__ = "models"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_models_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), unique=True, index=True, nullable=False)  # e.g., 'gpt-4', 'deepseek-coder'
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, BigInteger, Date
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, Date, UniqueConstraint
 from sqlalchemy.sql import func
 from app.db.database import Base
 
 class UsageStat(Base):
     __tablename__ = "usage_stats"
+    __table_args__ = (
+        # One rollup row per (user, model, day), upserted as log batches are written
+        UniqueConstraint("user_id", "model_id", "date", name="uq_usage_stats_user_model_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False, index=True)  # Manual FK
@@ -13,6 +17,7 @@ class UsageStat(Base):
     total_tokens = Column(BigInteger, default=0)
     prompt_tokens = Column(BigInteger, default=0)
     completion_tokens = Column(BigInteger, default=0)
+    total_latency_ms = Column(BigInteger, default=0)  # Sum, divide by request_count for the average
     total_cost = Column(BigInteger, default=0)  # Cost in cents
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
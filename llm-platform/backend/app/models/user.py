@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.db.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(255), unique=True, index=True, nullable=False)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional, Dict, Any
 from datetime import datetime
 
@@ -35,5 +35,20 @@ class ModelInDB(ModelBase):
     class Config:
         from_attributes = True
 
+    @field_validator("model_metadata")
+    @classmethod
+    def redact_deployment_keys(cls, value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Plaintext deployment api_key values are write-only, never returned"""
+        deployments = (value or {}).get("deployments")
+        if not isinstance(deployments, list):
+            return value
+        return {
+            **value,
+            "deployments": [
+                {k: v for k, v in entry.items() if k != "api_key"} if isinstance(entry, dict) else entry
+                for entry in deployments
+            ]
+        }
+
 class Model(ModelInDB):
     pass
\ No newline at end of file
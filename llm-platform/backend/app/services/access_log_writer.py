@@ -0,0 +1,202 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import logging
+from app.core.config import settings
+from app.crud.access_log import access_log as access_log_crud
+from app.crud.usage_stat import aggregate_log_rows, usage_stat as usage_stat_crud
+from app.db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Every row carries the same keys so the batch can be sent as one executemany
+LOG_DEFAULTS: Dict[str, Any] = {
+    "prompt_tokens": 0,
+    "completion_tokens": 0,
+    "total_tokens": 0,
+    "prompt_hash": None,
+    "cache_hit": False,
+    "coalesced": False,
+    "ip_address": None,
+    "user_agent": None,
+    "error_message": None,
+}
+
+class AccessLogWriter:
+    """Bounded queue of access log rows drained by a background task.
+
+    Rows are bulk-inserted, together with their usage_stats rollups, once
+    batch_size rows are waiting or flush_interval has passed since the first
+    row of the batch. When the queue is full the row is either dropped and
+    counted ('drop') or the caller waits for room ('block').
+
+    A batch whose commit fails is retried max_retries times with exponential
+    backoff, then written row by row so only the rows that still fail are
+    lost. Those are counted as failed, apart from the queue-full drops.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        overflow: str = "drop",
+        max_retries: int = 3,
+        retry_delay: float = 0.5
+    ):
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"Unknown access log overflow policy: {overflow}")
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.queue: Optional[asyncio.Queue] = None
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.write_errors = 0
+        self.batches = 0
+        self._batch: List[Dict[str, Any]] = []
+        self._writing: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _queue(self) -> asyncio.Queue:
+        # Created lazily so it binds to the running event loop
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+        return self.queue
+
+    async def submit(self, **fields: Any) -> bool:
+        """Queue one log row, returns False if it was dropped"""
+        row = {**LOG_DEFAULTS, **fields}
+        row.setdefault("created_at", datetime.utcnow())
+        queue = self._queue()
+        if self.overflow == "block":
+            await queue.put(row)
+        else:
+            try:
+                queue.put_nowait(row)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    logger.warning(f"Access log queue full, {self.dropped} rows dropped so far")
+                return False
+        self.enqueued += 1
+        return True
+
+    async def _commit(self, rows: List[Dict[str, Any]]) -> None:
+        async with AsyncSessionLocal() as db:
+            await access_log_crud.create_logs_batch_async(db, rows=rows)
+            # Rollups commit with the rows they count, so they never drift
+            await usage_stat_crud.add_usage_async(db, deltas=aggregate_log_rows(rows))
+            await db.commit()
+        self.written += len(rows)
+        self.batches += 1
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._commit(batch)
+                return
+            except Exception as e:
+                self.write_errors += 1
+                logger.warning(
+                    f"Error writing {len(batch)} access logs (attempt {attempt + 1}): {e}"
+                )
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        # Out of retries: a single bad row must not take the rest with it
+        failed = len(batch)
+        if len(batch) > 1:
+            failed = 0
+            for row in batch:
+                try:
+                    await self._commit([row])
+                except Exception as e:
+                    self.write_errors += 1
+                    failed += 1
+                    logger.debug(f"Error writing access log row: {e}")
+        if failed:
+            self.failed += failed
+            logger.error(f"Gave up on {failed} of {len(batch)} access logs, {self.failed} lost so far")
+
+    async def _collect(self) -> None:
+        queue = self._queue()
+        self._batch.append(await queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(self._batch) < self.batch_size:
+            # Take whatever is already queued without waiting
+            while len(self._batch) < self.batch_size and not queue.empty():
+                self._batch.append(queue.get_nowait())
+            timeout = deadline - loop.time()
+            if len(self._batch) >= self.batch_size or timeout <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self) -> None:
+        while True:
+            await self._collect()
+            batch, self._batch = self._batch, []
+            # Shielded so shutdown never interrupts a commit half way
+            self._writing = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._writing)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def flush(self) -> int:
+        """Write everything queued so far, returns rows written"""
+        queue = self._queue()
+        rows, self._batch = self._batch, []
+        while not queue.empty():
+            rows.append(queue.get_nowait())
+        written = self.written
+        for i in range(0, len(rows), self.batch_size):
+            await self._write(rows[i:i + self.batch_size])
+        return self.written - written
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writing is not None and not self._writing.done():
+            await self._writing
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "overflow": self.overflow,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "write_errors": self.write_errors,
+            "batches": self.batches
+        }
+
+# Global access log writer instance
+access_log_writer = AccessLogWriter(
+    queue_size=settings.ACCESS_LOG_QUEUE_SIZE,
+    batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+    flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL_SECONDS,
+    overflow=settings.ACCESS_LOG_OVERFLOW,
+    max_retries=settings.ACCESS_LOG_WRITE_RETRIES,
+    retry_delay=settings.ACCESS_LOG_RETRY_DELAY_SECONDS
+)
@@ -0,0 +1,88 @@
+from typing import Any, Dict, Optional
+import time
+
+class UpstreamUnavailableError(Exception):
+    """No deployment of a model or its fallbacks could serve the request"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after  # Seconds until an open breaker lets a probe through
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """Every remaining deployment of a model has an open breaker"""
+
+    def __init__(self, model_name: str, retry_after: float):
+        super().__init__(f"All deployments of model '{model_name}' are unavailable", retry_after)
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one deployment.
+
+    failure_threshold consecutive upstream failures open it. While open,
+    requests are refused without touching the network. After open_seconds
+    up to half_open_max_calls probes are let through: a success closes the
+    breaker, a failure opens it for another open_seconds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.opens = 0
+
+    def allows(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.open_seconds
+        return self.probes < self.half_open_max_calls
+
+    def retry_after(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(self.open_seconds - (time.monotonic() - self.opened_at), 0.0)
+
+    def on_request(self) -> None:
+        """Called once a request is routed here, claims a probe slot when half-open"""
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+            self.probes = 0
+        if self.state == self.HALF_OPEN:
+            self.probes += 1
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+        self.probes = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.opens += 1
+
+    def record_neutral(self) -> None:
+        """Outcome says nothing about the upstream (bad request, client gone)"""
+        if self.state == self.HALF_OPEN and self.probes:
+            self.probes -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opens": self.opens,
+            "retry_after_seconds": self.retry_after()
+        }
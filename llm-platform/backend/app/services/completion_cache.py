@@ -0,0 +1,251 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from app.core.cache import SizedTTLCache
+from app.core.config import settings
+from app.schemas.chat import (
+    ChatCompletionChoice, ChatCompletionChunk, ChatCompletionChunkChoice,
+    ChatCompletionChunkDelta, ChatCompletionRequest, ChatCompletionResponse,
+    ChatCompletionUsage, ChatMessage, MessageRole
+)
+
+logger = logging.getLogger(__name__)
+
+# Request header: 'on' opts a sampled request in, 'off' bypasses the cache
+# and single-flight coalescing.
+# Response header: 'hit' or 'miss' for requests that were looked up.
+CACHE_HEADER = "X-Completion-Cache"
+
+def prompt_hash(request: ChatCompletionRequest, model_name: str) -> str:
+    """SHA-256 of the model, messages and sampling parameters in canonical JSON"""
+    canonical = {
+        "model": model_name,
+        "messages": [{"role": m.role.value, "content": m.content} for m in request.messages],
+        "temperature": request.temperature,
+        "max_tokens": request.max_tokens,
+        "top_p": request.top_p,
+        "frequency_penalty": request.frequency_penalty,
+        "presence_penalty": request.presence_penalty,
+        "stop": request.stop,
+    }
+    raw = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def is_cacheable(request: ChatCompletionRequest, header: Optional[str]) -> bool:
+    """Only deterministic requests are cached unless the caller opts in"""
+    header = (header or "").strip().lower()
+    if header == "off":
+        return False
+    return header == "on" or request.temperature == 0
+
+def response_from_stream(
+    first_chunk: ChatCompletionChunk,
+    content: List[str],
+    finish_reason: Optional[str],
+    usage: ChatCompletionUsage
+) -> ChatCompletionResponse:
+    """Fold a finished stream into the response it is cached as"""
+    return ChatCompletionResponse(
+        id=first_chunk.id,
+        created=first_chunk.created,
+        model=first_chunk.model,
+        choices=[ChatCompletionChoice(
+            index=0,
+            message=ChatMessage(role=MessageRole.ASSISTANT, content="".join(content)),
+            finish_reason=finish_reason or "stop"
+        )],
+        usage=usage
+    )
+
+def replay_chunks(response: ChatCompletionResponse) -> List[ChatCompletionChunk]:
+    """A cached response as stream chunks: role, content, then finish_reason"""
+    choice = response.choices[0]
+
+    def chunk(delta: ChatCompletionChunkDelta, finish_reason: Optional[str] = None):
+        return ChatCompletionChunk(
+            id=response.id, created=response.created, model=response.model,
+            choices=[ChatCompletionChunkChoice(index=0, delta=delta, finish_reason=finish_reason)]
+        )
+
+    return [
+        chunk(ChatCompletionChunkDelta(role=MessageRole.ASSISTANT)),
+        chunk(ChatCompletionChunkDelta(content=choice.message.content)),
+        chunk(ChatCompletionChunkDelta(), choice.finish_reason or "stop"),
+    ]
+
+class CompletionCache:
+    """Exact-match cache of chat completions.
+
+    Entries live in a byte-bounded in-memory LRU and, when disk_dir is set,
+    also as one JSON file per key under disk_dir, which survives restarts
+    and is shared by the workers of a host. Disk hits are promoted to
+    memory for no longer than the file has left to live. Every
+    disk_sweep_interval a write triggers a background sweep that removes
+    expired files and then the oldest ones until the tier fits disk_max_bytes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 3600.0,
+        disk_dir: Optional[str] = None,
+        disk_ttl: float = 86400.0,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+        disk_sweep_interval: float = 300.0,
+        shared: bool = False
+    ):
+        self.memory = SizedTTLCache(max_bytes=max_bytes, ttl=ttl)
+        self.disk_dir = disk_dir
+        self.disk_ttl = disk_ttl
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_sweep_interval = disk_sweep_interval
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.stores = 0
+        self.disk_bytes = 0  # As of the last sweep
+        self.disk_sweeps = 0
+        self.disk_evictions = 0
+        self._next_sweep = 0.0  # Sweep on the first write, cleaning up after restarts
+        self._sweep_task: Optional[asyncio.Task] = None
+
+    def key(self, prompt_hash: str, user_id: int) -> str:
+        return prompt_hash if self.shared else f"{user_id}-{prompt_hash}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[-2:], f"{key}.json")
+
+    def _disk_get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Entry bytes and seconds it has left to live, or None"""
+        path = self._path(key)
+        try:
+            remaining = self.disk_ttl - (time.time() - os.path.getmtime(path))
+            if remaining <= 0:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                return f.read(), remaining
+        except FileNotFoundError:
+            return None
+
+    def _disk_set(self, key: str, raw: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(raw)
+        # Readers never see a partial file
+        os.replace(tmp, path)
+
+    def _sweep(self) -> None:
+        """Remove expired files, then the oldest until the tier fits disk_max_bytes"""
+        now = time.time()
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                    if now - stat.st_mtime > self.disk_ttl:
+                        os.remove(path)
+                        self.disk_evictions += 1
+                    elif name.endswith(".json"):
+                        entries.append((stat.st_mtime, stat.st_size, path))
+                        total += stat.st_size
+                except FileNotFoundError:
+                    # Another worker got there first
+                    continue
+        if total > self.disk_max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.disk_max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self.disk_evictions += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+        self.disk_bytes = total
+        self.disk_sweeps += 1
+
+    async def _run_sweep(self) -> None:
+        try:
+            await asyncio.to_thread(self._sweep)
+        except OSError as e:
+            logger.warning(f"Error sweeping completion cache directory: {e}")
+
+    def _maybe_sweep(self) -> None:
+        now = time.monotonic()
+        if now < self._next_sweep or (self._sweep_task and not self._sweep_task.done()):
+            return
+        self._next_sweep = now + self.disk_sweep_interval
+        self._sweep_task = asyncio.create_task(self._run_sweep())
+
+    async def get(self, key: str) -> Optional[ChatCompletionResponse]:
+        """Cached response under a fresh id, or None"""
+        raw = self.memory.get(key)
+        if raw is None and self.disk_dir:
+            entry = None
+            try:
+                entry = await asyncio.to_thread(self._disk_get, key)
+            except OSError as e:
+                logger.warning(f"Error reading completion cache entry: {e}")
+            if entry is not None:
+                raw, remaining = entry
+                self.disk_hits += 1
+                # Never outlive the file it came from
+                self.memory.set(key, raw, ttl=min(self.memory.ttl, remaining))
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        data = json.loads(raw)
+        data.update(id=f"chatcmpl-{uuid.uuid4().hex[:29]}", created=int(time.time()))
+        return ChatCompletionResponse(**data)
+
+    async def set(self, key: str, response: ChatCompletionResponse) -> None:
+        raw = response.json().encode("utf-8")
+        self.memory.set(key, raw)
+        self.stores += 1
+        if self.disk_dir:
+            try:
+                await asyncio.to_thread(self._disk_set, key, raw)
+            except OSError as e:
+                logger.warning(f"Error writing completion cache entry: {e}")
+            self._maybe_sweep()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "disk_hits": self.disk_hits,
+            "stores": self.stores,
+            "shared": self.shared,
+            "disk_dir": self.disk_dir,
+            "disk_bytes": self.disk_bytes,
+            "disk_max_bytes": self.disk_max_bytes,
+            "disk_sweeps": self.disk_sweeps,
+            "disk_evictions": self.disk_evictions,
+            "memory": self.memory.stats()
+        }
+
+# Global completion cache instance, None when disabled
+completion_cache: Optional[CompletionCache] = CompletionCache(
+    max_bytes=settings.COMPLETION_CACHE_MAX_BYTES,
+    ttl=settings.COMPLETION_CACHE_TTL_SECONDS,
+    disk_dir=settings.COMPLETION_CACHE_DIR,
+    disk_ttl=settings.COMPLETION_CACHE_DISK_TTL_SECONDS,
+    disk_max_bytes=settings.COMPLETION_CACHE_DISK_MAX_BYTES,
+    disk_sweep_interval=settings.COMPLETION_CACHE_DISK_SWEEP_SECONDS,
+    shared=settings.COMPLETION_CACHE_SHARED
+) if settings.COMPLETION_CACHE_ENABLED else None
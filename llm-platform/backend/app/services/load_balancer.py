@@ -0,0 +1,176 @@
+from typing import Any, Collection, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import random
+import time
+import httpx
+from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.model_registry import Deployment, ModelDescriptor
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Errors that say something about the deployment rather than the request"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(exc, httpx.HTTPError)
+
+class _DeploymentState:
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.latency_ms: Optional[float] = None  # Moving average, None until measured
+        self.error_rate = 0.0  # Moving average of failures
+
+class _Call:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_byte_at: Optional[float] = None
+
+    def mark_first_byte(self) -> None:
+        if self.first_byte_at is None:
+            self.first_byte_at = time.perf_counter()
+
+    def latency_ms(self) -> float:
+        return ((self.first_byte_at or time.perf_counter()) - self.started) * 1000
+
+class LoadBalancer:
+    """Routes each request to one of a model's deployments.
+
+    A deployment's weight is its priority, scaled down by its recent error
+    rate and by how much slower its moving latency average is than the
+    fastest deployment of the same model. 'weighted' picks at random in
+    proportion to that weight; 'least_outstanding' picks the lowest
+    in-flight count per unit of weight. Deployments with priority 0 only
+    share traffic when every deployment of the model has priority 0.
+    Deployments whose circuit breaker is open are skipped; when none is left
+    choose() raises CircuitOpenError at once instead of waiting on a timeout.
+    """
+
+    def __init__(
+        self,
+        policy: str = "weighted",
+        alpha: float = 0.2,
+        min_health: float = 0.05,
+        failure_threshold: int = 5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        if policy not in ("weighted", "least_outstanding"):
+            raise ValueError(f"Unknown load balancing policy: {policy}")
+        self.policy = policy
+        self.alpha = alpha
+        self.min_health = min_health
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.rejected = 0
+        self._states: Dict[Tuple[str, str], _DeploymentState] = {}
+
+    def _state(self, model_name: str, deployment: Deployment) -> _DeploymentState:
+        key = (model_name, deployment.name)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _DeploymentState(CircuitBreaker(
+                self.failure_threshold, self.open_seconds, self.half_open_max_calls
+            ))
+        return state
+
+    def _weights(self, model_name: str, deployments: Tuple[Deployment, ...]) -> List[float]:
+        states = [self._state(model_name, d) for d in deployments]
+        measured = [s.latency_ms for s in states if s.latency_ms]
+        fastest = min(measured) if measured else None
+        if any(d.weight > 0 for d in deployments):
+            base = [d.weight for d in deployments]
+        else:
+            base = [1] * len(deployments)
+        weights = []
+        for weight, state in zip(base, states):
+            # Never drop to zero, so a recovered deployment gets traffic again
+            health = max(1 - state.error_rate, self.min_health)
+            speed = fastest / state.latency_ms if fastest and state.latency_ms else 1.0
+            weights.append(max(weight, 0) * health * speed)
+        return weights
+
+    def choose(self, model: ModelDescriptor, exclude: Collection[str] = ()) -> Deployment:
+        """Pick a deployment not named in exclude whose breaker lets requests through"""
+        remaining = [d for d in model.deployments if d.name not in exclude]
+        deployments = tuple(d for d in remaining if self._state(model.name, d).breaker.allows())
+        if not deployments:
+            self.rejected += 1
+            retry_after = min(
+                (self._state(model.name, d).breaker.retry_after() for d in remaining), default=0.0
+            )
+            raise CircuitOpenError(model.name, retry_after)
+        if len(deployments) == 1:
+            chosen = deployments[0]
+        else:
+            weights = self._weights(model.name, deployments)
+            candidates = [(d, w) for d, w in zip(deployments, weights) if w > 0]
+            if self.policy == "least_outstanding":
+                chosen = min(
+                    candidates,
+                    key=lambda c: (
+                        (self._state(model.name, c[0]).outstanding + 1) / c[1], random.random()
+                    )
+                )[0]
+            else:
+                chosen = random.choices(
+                    [d for d, _ in candidates], weights=[w for _, w in candidates]
+                )[0]
+        self._state(model.name, chosen).breaker.on_request()
+        return chosen
+
+    @contextmanager
+    def track(self, model_name: str, deployment: Deployment) -> Iterator[_Call]:
+        """Count a request as outstanding and feed its outcome into the averages"""
+        state = self._state(model_name, deployment)
+        state.outstanding += 1
+        state.requests += 1
+        call = _Call()
+        recorded = False
+        try:
+            yield call
+        except Exception as e:
+            if is_upstream_failure(e):
+                state.failures += 1
+                state.error_rate += self.alpha * (1 - state.error_rate)
+                state.breaker.record_failure()
+                recorded = True
+            raise
+        else:
+            latency = call.latency_ms()
+            if state.latency_ms is None:
+                state.latency_ms = latency
+            else:
+                state.latency_ms += self.alpha * (latency - state.latency_ms)
+            state.error_rate -= self.alpha * state.error_rate
+            state.breaker.record_success()
+            recorded = True
+        finally:
+            state.outstanding -= 1
+            if not recorded:
+                state.breaker.record_neutral()
+
+    def stats(self) -> Dict[str, Any]:
+        models: Dict[str, Dict[str, Any]] = {}
+        for (model_name, deployment_name), state in self._states.items():
+            models.setdefault(model_name, {})[deployment_name] = {
+                "outstanding": state.outstanding,
+                "requests": state.requests,
+                "failures": state.failures,
+                "latency_ms": state.latency_ms,
+                "error_rate": state.error_rate,
+                "circuit": state.breaker.stats()
+            }
+        return {"policy": self.policy, "rejected": self.rejected, "models": models}
+
+# Global load balancer instance
+load_balancer = LoadBalancer(
+    policy=settings.LOAD_BALANCING_POLICY,
+    alpha=settings.LOAD_BALANCING_EWMA_ALPHA,
+    failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+    half_open_max_calls=settings.CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS
+)
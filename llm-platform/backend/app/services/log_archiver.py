@@ -0,0 +1,186 @@
+from typing import Any, Dict, Iterator, List, Optional
+from datetime import date, datetime, timedelta
+import asyncio
+import gzip
+import json
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows, where workers are not forked from one master
+    fcntl = None
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.crud.access_log import access_log as access_log_crud, day_range
+from app.db.database import SessionLocal
+from app.models.access_log import AccessLog
+
+logger = logging.getLogger(__name__)
+
+def _serialize(log: AccessLog) -> bytes:
+    row = {c.name: getattr(log, c.name) for c in AccessLog.__table__.columns}
+    if isinstance(row["created_at"], datetime):
+        row["created_at"] = row["created_at"].isoformat()
+    return (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+
+class AccessLogArchiver:
+    """Moves access logs past the retention age into daily gzip NDJSON files.
+
+    Each day is written as a new gzip member appended to
+    <archive_dir>/YYYY/MM/access_logs-YYYY-MM-DD.ndjson.gz and fsynced
+    before its rows are deleted from the table in bounded batches. A crash
+    between the two only leaves rows that are archived again on the next
+    run; readers skip the duplicates.
+    """
+
+    def __init__(
+        self,
+        archive_dir: str,
+        retention_days: Optional[int] = 90,
+        batch_size: int = 5000,
+        interval: float = 3600.0
+    ):
+        self.archive_dir = archive_dir
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.archived = 0
+        self.runs = 0
+        self.last_run_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def path_for(self, day: date) -> str:
+        return os.path.join(
+            self.archive_dir, f"{day:%Y}", f"{day:%m}", f"access_logs-{day.isoformat()}.ndjson.gz"
+        )
+
+    def archive_day(self, db: Session, day: date) -> int:
+        """Archive then delete every log created on day, returns rows moved"""
+        start, end = day_range(day, day)
+        where = [AccessLog.created_at >= start, AccessLog.created_at < end]
+        logs, cursor = access_log_crud.get_page(db, limit=self.batch_size, where=where)
+        if not logs:
+            return 0
+
+        path = self.path_for(day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        ids: List[int] = []
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                while logs:
+                    for log in logs:
+                        gz.write(_serialize(log))
+                        ids.append(log.id)
+                    db.expunge_all()
+                    if not cursor:
+                        break
+                    logs, cursor = access_log_crud.get_page(
+                        db, cursor=cursor, limit=self.batch_size, where=where
+                    )
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        for i in range(0, len(ids), self.batch_size):
+            access_log_crud.remove_ids(db, ids=ids[i:i + self.batch_size])
+        return len(ids)
+
+    def run_once(self) -> int:
+        """Archive every whole day older than the retention age"""
+        if self.retention_days is None:
+            return 0
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with open(os.path.join(self.archive_dir, ".lock"), "w") as lock:
+            try:
+                # Only one worker process archives at a time
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            db = SessionLocal()
+            try:
+                cutoff = datetime.utcnow().date() - timedelta(days=self.retention_days)
+                oldest = access_log_crud.get_oldest_created_at(db)
+                total = 0
+                day = oldest.date() if oldest else cutoff
+                while day < cutoff:
+                    moved = self.archive_day(db, day)
+                    if moved:
+                        logger.info(f"Archived {moved} access logs for {day}")
+                    total += moved
+                    day += timedelta(days=1)
+                self.archived += total
+                self.runs += 1
+                self.last_run_at = datetime.utcnow()
+                return total
+            except Exception as e:
+                logger.error(f"Error archiving access logs: {e}")
+                db.rollback()
+                return 0
+            finally:
+                db.close()
+
+    def iter_archive(self, start_date: date, end_date: date) -> Iterator[bytes]:
+        """Yield archived NDJSON lines for start_date..end_date inclusive"""
+        day = start_date
+        while day <= end_date:
+            path = self.path_for(day)
+            if os.path.exists(path):
+                seen = set()
+                try:
+                    with gzip.open(path, "rb") as f:
+                        for line in f:
+                            log_id = json.loads(line)["id"]
+                            if log_id not in seen:
+                                seen.add(log_id)
+                                yield line
+                except (EOFError, gzip.BadGzipFile):
+                    # Member cut short by a crash, its rows are still in the table
+                    logger.warning(f"Truncated access log archive {path}")
+            day += timedelta(days=1)
+
+    def list_archives(self) -> List[Dict[str, Any]]:
+        archives = []
+        for root, _, files in os.walk(self.archive_dir):
+            for name in files:
+                if name.startswith("access_logs-") and name.endswith(".ndjson.gz"):
+                    archives.append({
+                        "date": name[len("access_logs-"):-len(".ndjson.gz")],
+                        "size_bytes": os.path.getsize(os.path.join(root, name))
+                    })
+        return sorted(archives, key=lambda a: a["date"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retention_days": self.retention_days,
+            "archive_dir": self.archive_dir,
+            "archived": self.archived,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.to_thread(self.run_once)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None and self.retention_days is not None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global access log archiver instance
+log_archiver = AccessLogArchiver(
+    archive_dir=settings.ACCESS_LOG_ARCHIVE_DIR,
+    retention_days=settings.ACCESS_LOG_RETENTION_DAYS,
+    batch_size=settings.ACCESS_LOG_ARCHIVE_BATCH_SIZE,
+    interval=settings.ACCESS_LOG_RETENTION_INTERVAL_SECONDS
+)
@@ -0,0 +1,174 @@
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from dataclasses import dataclass, field
+from types import MappingProxyType
+import asyncio
+import copy
+import logging
+import os
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.crud.config_version import config_version
+from app.db.database import AsyncSessionLocal, SessionLocal
+from app.models.model import Model
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_NAME = "models"
+
+@dataclass(frozen=True)
+class Deployment:
+    """One upstream target (endpoint and/or key) a model can be served from"""
+    name: str
+    endpoint_url: Optional[str]
+    api_key: Optional[str] = field(default=None, repr=False)
+    weight: int = 0
+
+def parse_deployments(db_model: Model) -> Tuple[Deployment, ...]:
+    """Deployments from model_metadata['deployments'], else the model's own endpoint.
+
+    Each entry may set name, endpoint_url, api_key or api_key_env (the name
+    of an environment variable holding the key) and priority, which is the
+    routing weight and defaults to the model's priority. Prefer api_key_env:
+    a plaintext api_key is stored in the database (responses redact it).
+    """
+    priority = db_model.priority or 0
+    entries = (db_model.model_metadata or {}).get("deployments")
+    if not entries:
+        return (Deployment(name="default", endpoint_url=db_model.endpoint_url, weight=priority),)
+    deployments = []
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            logger.warning(f"Ignoring malformed deployment {i} of model {db_model.name}")
+            continue
+        api_key = entry.get("api_key")
+        if not api_key and entry.get("api_key_env"):
+            api_key = os.environ.get(entry["api_key_env"])
+        deployments.append(Deployment(
+            name=str(entry.get("name") or i),
+            endpoint_url=entry.get("endpoint_url") or db_model.endpoint_url,
+            api_key=api_key,
+            weight=int(entry.get("priority", priority) or 0)
+        ))
+    return tuple(deployments) or (
+        Deployment(name="default", endpoint_url=db_model.endpoint_url, weight=priority),
+    )
+
+@dataclass(frozen=True)
+class ModelDescriptor:
+    """Immutable snapshot of a models row used by the request path"""
+    id: int
+    name: str
+    display_name: str
+    provider: str
+    endpoint_url: Optional[str]
+    is_active: bool
+    priority: int
+    max_tokens: int
+    description: Optional[str]
+    model_metadata: Mapping[str, Any]
+    deployments: Tuple[Deployment, ...]
+
+    @classmethod
+    def from_model(cls, db_model: Model) -> "ModelDescriptor":
+        return cls(
+            id=db_model.id,
+            name=db_model.name,
+            display_name=db_model.display_name,
+            provider=db_model.provider,
+            endpoint_url=db_model.endpoint_url,
+            is_active=db_model.is_active,
+            priority=db_model.priority or 0,
+            max_tokens=db_model.max_tokens or 4096,
+            description=db_model.description,
+            model_metadata=MappingProxyType(copy.deepcopy(db_model.model_metadata or {})),
+            deployments=parse_deployments(db_model)
+        )
+
+class ModelRegistry:
+    """Process-wide name -> ModelDescriptor map.
+
+    Admin changes bump the 'models' row in config_versions. Every worker
+    polls that single row and reloads the table only when it moved, so
+    lookups never touch the database.
+    """
+
+    def __init__(self, poll_interval: float = 2.0):
+        self.poll_interval = poll_interval
+        self.version = -1
+        self.reloads = 0
+        self._by_name: Dict[str, ModelDescriptor] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, name: str) -> Optional[ModelDescriptor]:
+        return self._by_name.get(name)
+
+    def all(self) -> List[ModelDescriptor]:
+        return list(self._by_name.values())
+
+    def _install(self, models: List[Model], version: int) -> None:
+        # Swap the whole dict so readers never see a partial reload
+        self._by_name = {m.name: ModelDescriptor.from_model(m) for m in models}
+        self.version = version
+        self.reloads += 1
+
+    def load(self) -> None:
+        """Blocking initial load, called once at startup"""
+        db = SessionLocal()
+        try:
+            version = config_version.get_version(db, name=REGISTRY_NAME)
+            self._install(db.execute(select(Model)).scalars().all(), version)
+        finally:
+            db.close()
+        logger.info(f"Loaded {len(self._by_name)} models into the registry (version {version})")
+
+    async def reload_async(self, db: AsyncSession) -> None:
+        version = await config_version.get_version_async(db, name=REGISTRY_NAME)
+        result = await db.execute(select(Model))
+        self._install(result.scalars().all(), version)
+
+    async def refresh_if_changed(self) -> bool:
+        async with AsyncSessionLocal() as db:
+            version = await config_version.get_version_async(db, name=REGISTRY_NAME)
+            if version == self.version:
+                return False
+            await self.reload_async(db)
+        logger.info(f"Model registry reloaded at version {self.version}")
+        return True
+
+    async def bump(self, db: AsyncSession) -> None:
+        """Record a models change for all workers and reload this one now"""
+        await config_version.bump_async(db, name=REGISTRY_NAME)
+        await self.reload_async(db)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh_if_changed()
+            except Exception as e:
+                logger.error(f"Error polling model registry version: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "models": len(self._by_name),
+            "reloads": self.reloads,
+            "poll_interval_seconds": self.poll_interval
+        }
+
+# Global model registry instance
+model_registry = ModelRegistry(poll_interval=settings.MODEL_REGISTRY_POLL_SECONDS)
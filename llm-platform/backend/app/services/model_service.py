@@ -1,10 +1,22 @@
-from typing import AsyncGenerator, Dict, Any, Optional
+from typing import AsyncGenerator, Dict, Any, Iterator, List, Optional, Tuple
 from abc import ABC, abstractmethod
-import httpx
 import json
+import logging
 from app.schemas.chat import ChatCompletionRequest, ChatCompletionResponse, ChatCompletionChunk
 from app.models.model import Model
 from app.core.config import settings
+from app.services.circuit_breaker import CircuitOpenError, UpstreamUnavailableError
+from app.services.load_balancer import is_upstream_failure, load_balancer
+from app.services.model_registry import Deployment, model_registry
+from app.services.upstream_clients import upstream_clients
+
+logger = logging.getLogger(__name__)
+
+# Used when a model row has no endpoint_url
+DEFAULT_ENDPOINTS = {
+    "openai": "https://api.openai.com/v1/chat/completions",
+    "deepseek": "https://api.deepseek.com/v1/chat/completions",
+}
 
 class BaseModelService(ABC):
     @abstractmethod
@@ -26,40 +38,110 @@ class BaseModelService(ABC):
 class ModelService(BaseModelService):
     """Real model service for actual API calls"""
     
-    def __init__(self):
-        self.client = httpx.AsyncClient(timeout=30.0)
+    def _endpoint(self, model: Model, deployment: Deployment) -> str:
+        endpoint = deployment.endpoint_url or DEFAULT_ENDPOINTS.get(model.provider.lower())
+        if not endpoint:
+            raise ValueError(f"No endpoint_url configured for model: {model.name}")
+        return endpoint
+    
+    def _handlers(self, model: Model):
+        """(completion, stream) callables for the model's provider, None if unsupported"""
+        provider = model.provider.lower()
+        if provider == "openai":
+            return self._openai_completion, self._openai_completion_stream
+        elif provider == "deepseek":
+            return self._deepseek_completion, self._deepseek_completion_stream
+        return None
+    
+    def _attempts(
+        self, model: Model, circuit_waits: List[float]
+    ) -> Iterator[Tuple[Model, Deployment]]:
+        """Deployments to try in order: the model's own, then each fallback's.
+        
+        Fallbacks are the model names listed in model_metadata['fallbacks'],
+        e.g. gpt-4 -> ["claude-3", "gpt-3.5-turbo"]. Only the requested
+        model's list is followed. Inactive or unsupported fallbacks and
+        deployments with an open breaker are skipped without a network call,
+        recording how long until they allow a probe in circuit_waits.
+        """
+        if self._handlers(model) is None:
+            raise ValueError(f"Unsupported model provider: {model.provider}")
+        candidates = [model]
+        for name in model.model_metadata.get("fallbacks") or ():
+            fallback = model_registry.get(name)
+            if not fallback or not fallback.is_active or self._handlers(fallback) is None:
+                continue
+            if all(c.name != fallback.name for c in candidates):
+                candidates.append(fallback)
+        for candidate in candidates:
+            tried = set()
+            while len(tried) < len(candidate.deployments):
+                try:
+                    deployment = load_balancer.choose(candidate, exclude=tried)
+                except CircuitOpenError as e:
+                    circuit_waits.append(e.retry_after)
+                    break
+                tried.add(deployment.name)
+                yield candidate, deployment
+    
+    def _can_fail_over(self, e: Exception) -> bool:
+        return is_upstream_failure(e) or isinstance(e, NotImplementedError)
     
     async def chat_completion(
         self, 
         request: ChatCompletionRequest, 
         model: Model
     ) -> ChatCompletionResponse:
-        """Call actual model API"""
-        if model.provider.lower() == "openai":
-            return await self._openai_completion(request, model)
-        elif model.provider.lower() == "deepseek":
-            return await self._deepseek_completion(request, model)
-        else:
-            raise ValueError(f"Unsupported model provider: {model.provider}")
+        """Call actual model API, failing over across deployments and fallback models"""
+        last_error = None
+        circuit_waits: List[float] = []
+        for candidate, deployment in self._attempts(model, circuit_waits):
+            complete = self._handlers(candidate)[0]
+            try:
+                with load_balancer.track(candidate.name, deployment):
+                    return await complete(request, candidate, deployment)
+            except Exception as e:
+                if not self._can_fail_over(e):
+                    raise
+                last_error = e
+                logger.warning(f"Upstream {candidate.name}/{deployment.name} failed, failing over: {e}")
+        raise UpstreamUnavailableError(
+            f"No upstream available for model '{model.name}'", min(circuit_waits, default=None)
+        ) from last_error
     
     async def chat_completion_stream(
         self, 
         request: ChatCompletionRequest, 
         model: Model
     ) -> AsyncGenerator[ChatCompletionChunk, None]:
-        """Stream response from actual model API"""
-        if model.provider.lower() == "openai":
-            async for chunk in self._openai_completion_stream(request, model):
-                yield chunk
-        elif model.provider.lower() == "deepseek":
-            async for chunk in self._deepseek_completion_stream(request, model):
-                yield chunk
-        else:
-            raise ValueError(f"Unsupported model provider: {model.provider}")
+        """Stream from actual model API, failing over until the first chunk is sent"""
+        last_error = None
+        circuit_waits: List[float] = []
+        for candidate, deployment in self._attempts(model, circuit_waits):
+            stream = self._handlers(candidate)[1]
+            started = False
+            try:
+                with load_balancer.track(candidate.name, deployment) as call:
+                    async for chunk in stream(request, candidate, deployment):
+                        # Streams are ranked by time to first chunk, not total length
+                        call.mark_first_byte()
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                if started or not self._can_fail_over(e):
+                    raise
+                last_error = e
+                logger.warning(f"Upstream {candidate.name}/{deployment.name} failed, failing over: {e}")
+        raise UpstreamUnavailableError(
+            f"No upstream available for model '{model.name}'", min(circuit_waits, default=None)
+        ) from last_error
     
-    async def _openai_completion(self, request: ChatCompletionRequest, model: Model) -> ChatCompletionResponse:
+    async def _openai_completion(
+        self, request: ChatCompletionRequest, model: Model, deployment: Deployment
+    ) -> ChatCompletionResponse:
         headers = {
-            "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+            "Authorization": f"Bearer {deployment.api_key or settings.OPENAI_API_KEY}",
             "Content-Type": "application/json"
         }
         
@@ -70,8 +152,8 @@ class ModelService(BaseModelService):
             "max_tokens": request.max_tokens,
         }
         
-        response = await self.client.post(
-            "https://api.openai.com/v1/chat/completions",
+        response = await upstream_clients.post(
+            self._endpoint(model, deployment),
             headers=headers,
             json=payload
         )
@@ -80,10 +162,10 @@ class ModelService(BaseModelService):
         return ChatCompletionResponse(**response.json())
     
     async def _openai_completion_stream(
-        self, request: ChatCompletionRequest, model: Model
+        self, request: ChatCompletionRequest, model: Model, deployment: Deployment
     ) -> AsyncGenerator[ChatCompletionChunk, None]:
         headers = {
-            "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+            "Authorization": f"Bearer {deployment.api_key or settings.OPENAI_API_KEY}",
             "Content-Type": "application/json"
         }
         
@@ -95,12 +177,14 @@ class ModelService(BaseModelService):
             "stream": True
         }
         
-        async with self.client.stream(
+        async with upstream_clients.stream(
             "POST",
-            "https://api.openai.com/v1/chat/completions",
+            self._endpoint(model, deployment),
             headers=headers,
             json=payload
         ) as response:
+            # Surface upstream errors instead of parsing an error body as SSE
+            response.raise_for_status()
             async for line in response.aiter_lines():
                 if line.startswith("data: "):
                     data = line[6:]  # Remove "data: " prefix
@@ -112,13 +196,15 @@ class ModelService(BaseModelService):
                     except json.JSONDecodeError:
                         continue
     
-    async def _deepseek_completion(self, request: ChatCompletionRequest, model: Model) -> ChatCompletionResponse:
+    async def _deepseek_completion(
+        self, request: ChatCompletionRequest, model: Model, deployment: Deployment
+    ) -> ChatCompletionResponse:
         # Similar implementation for Deepseek API
         # This is a placeholder - implement based on Deepseek's actual API
         raise NotImplementedError("Deepseek API integration not implemented")
     
     async def _deepseek_completion_stream(
-        self, request: ChatCompletionRequest, model: Model
+        self, request: ChatCompletionRequest, model: Model, deployment: Deployment
     ) -> AsyncGenerator[ChatCompletionChunk, None]:
         # Similar implementation for Deepseek API streaming
         raise NotImplementedError("Deepseek API streaming not implemented")
@@ -0,0 +1,151 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+import asyncio
+import uuid
+from app.core.config import settings
+
+T = TypeVar("T")
+
+_DONE = object()
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def _new_id() -> str:
+    return f"chatcmpl-{uuid.uuid4().hex[:29]}"
+
+class _Broadcast:
+    """One upstream stream and the queues of everyone reading it"""
+
+    def __init__(self):
+        self.history: List[Any] = []  # Chunks so far, replayed to late subscribers
+        self.subscribers: List[asyncio.Queue] = []
+        self.task: Optional[asyncio.Task] = None
+
+    def publish(self, item: Any) -> None:
+        for queue in self.subscribers:
+            queue.put_nowait(item)
+
+class Subscription:
+    """One caller's view of a shared stream.
+
+    The caller joins on first iteration, so a response that is never sent
+    never holds the upstream stream open. shared is True when the caller
+    joined a stream someone else started.
+    """
+
+    def __init__(self, flight: "SingleFlight", key: str, stream_fn: Callable[[], AsyncIterator[Any]]):
+        self.flight = flight
+        self.key = key
+        self.stream_fn = stream_fn
+        self.shared = False
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        broadcast, self.shared = self.flight._join(self.key, self.stream_fn)
+        queue: asyncio.Queue = asyncio.Queue()
+        for chunk in broadcast.history:
+            queue.put_nowait(chunk)
+        broadcast.subscribers.append(queue)
+        chunk_id = _new_id() if self.shared else None
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                # Followers get their own completion id, like a separate call
+                yield item.model_copy(update={"id": chunk_id}) if chunk_id else item
+        finally:
+            broadcast.subscribers.remove(queue)
+            if not broadcast.subscribers and not broadcast.task.done():
+                # Last reader left, stop paying for the upstream stream
+                self.flight._forget_stream(self.key, broadcast)
+                broadcast.task.cancel()
+
+class SingleFlight:
+    """Coalesces identical completion requests that are in flight at once.
+
+    Non-streaming callers with the same key await one shared upstream call.
+    Streaming callers share one upstream stream: a pump task copies each
+    chunk into a queue per subscriber, and subscribers that join late first
+    get the chunks already sent. A key is forgotten as soon as its call or
+    stream finishes, so only overlapping requests are coalesced.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self.calls = 0
+        self.coalesced_calls = 0
+        self.streams = 0
+        self.coalesced_streams = 0
+
+    async def call(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Result of fn, shared with concurrent callers of the same key, and
+        whether this caller joined a call someone else started"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced_calls += 1
+        else:
+            self.calls += 1
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: self._forget_call(key, t))
+        # Shielded so one caller disconnecting does not cancel the others
+        result = await asyncio.shield(task)
+        if shared:
+            result = result.model_copy(update={"id": _new_id()})
+        return result, shared
+
+    def _forget_call(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every caller went away
+
+    def stream(self, key: str, stream_fn: Callable[[], AsyncIterator[Any]]) -> Subscription:
+        """Chunks of stream_fn(), shared with concurrent subscribers of the same key"""
+        return Subscription(self, key, stream_fn)
+
+    def _join(self, key: str, stream_fn: Callable[[], AsyncIterator[Any]]) -> Tuple[_Broadcast, bool]:
+        broadcast = self._streams.get(key)
+        if broadcast is not None:
+            self.coalesced_streams += 1
+            return broadcast, True
+        self.streams += 1
+        broadcast = self._streams[key] = _Broadcast()
+        broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, stream_fn))
+        return broadcast, False
+
+    def _forget_stream(self, key: str, broadcast: _Broadcast) -> None:
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    async def _pump(self, key: str, broadcast: _Broadcast, stream_fn: Callable[[], AsyncIterator[Any]]) -> None:
+        chunks = stream_fn()
+        try:
+            async for chunk in chunks:
+                broadcast.history.append(chunk)
+                broadcast.publish(chunk)
+            self._forget_stream(key, broadcast)
+            broadcast.publish(_DONE)
+        except Exception as e:
+            self._forget_stream(key, broadcast)
+            broadcast.publish(_Failure(e))
+        finally:
+            await chunks.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "coalesced_calls": self.coalesced_calls,
+            "streams": self.streams,
+            "coalesced_streams": self.coalesced_streams,
+            "in_flight_calls": len(self._calls),
+            "in_flight_streams": len(self._streams),
+            "subscribers": sum(len(b.subscribers) for b in self._streams.values())
+        }
+
+# Global single-flight instance, None when disabled
+single_flight: Optional[SingleFlight] = SingleFlight() if settings.SINGLE_FLIGHT_ENABLED else None
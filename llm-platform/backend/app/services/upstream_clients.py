@@ -0,0 +1,230 @@
+from typing import Any, AsyncIterator, Dict
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+import httpx
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+def origin_of(url: str) -> str:
+    """scheme://host:port of a URL, the unit a connection pool is kept for"""
+    parsed = httpx.URL(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    return f"{parsed.scheme}://{parsed.host}:{port}"
+
+class _OriginMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0  # Sent and not finished, including those queued for a connection
+        self.active = 0  # Holding a pooled connection
+        self.peak_active = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+        self.pool_wait_ms_total = 0.0
+        self.pool_wait_ms_max = 0.0
+        self.connect_ms_total = 0.0
+
+    def as_dict(self, max_connections: int) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "active": self.active,
+            "queued": self.in_flight - self.active,
+            "utilization": self.active / max_connections,
+            "peak_utilization": self.peak_active / max_connections,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "new_connections": self.new_connections,
+            "tls_handshakes": self.tls_handshakes,
+            "connection_reuse_ratio": (
+                1 - self.new_connections / self.requests if self.requests else 0
+            ),
+            "avg_pool_wait_ms": self.pool_wait_ms_total / self.requests if self.requests else 0,
+            "max_pool_wait_ms": self.pool_wait_ms_max,
+            "avg_connect_ms": (
+                self.connect_ms_total / self.new_connections if self.new_connections else 0
+            )
+        }
+
+class _ChunkTimeoutStream(httpx.AsyncByteStream):
+    """Response body that fails with ReadTimeout if a chunk takes longer than timeout"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, timeout: float, request: httpx.Request):
+        self.stream = stream
+        self.timeout = timeout
+        self.request = request
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        chunks = self.stream.__aiter__()
+        while True:
+            try:
+                async with asyncio.timeout(self.timeout):
+                    chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                raise httpx.ReadTimeout(
+                    f"No data from upstream for {self.timeout}s", request=self.request
+                ) from None
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self.stream.aclose()
+
+class UpstreamClientManager:
+    """One pooled httpx.AsyncClient per upstream origin.
+
+    Clients are created on first use and kept for the life of the process,
+    so bursts reuse warm keep-alive connections instead of paying a TCP and
+    TLS handshake per request. The first-byte timeout bounds the wait for
+    response headers; after that the read timeout bounds the wait for each
+    body chunk.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+        connect_timeout: float = 5.0,
+        write_timeout: float = 10.0,
+        pool_timeout: float = 10.0,
+        first_byte_timeout: float = 60.0,
+        read_timeout: float = 30.0
+    ):
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("UPSTREAM_HTTP2 is set but the h2 package is missing, using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=first_byte_timeout,
+            write=write_timeout,
+            pool=pool_timeout
+        )
+        self.read_timeout = read_timeout
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._metrics: Dict[str, _OriginMetrics] = {}
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        origin = origin_of(url)
+        client = self._clients.get(origin)
+        if client is None:
+            client = self._clients[origin] = httpx.AsyncClient(
+                limits=self.limits, timeout=self.timeout, http2=self.http2
+            )
+            self._metrics.setdefault(origin, _OriginMetrics())
+        return client
+
+    def _tracer(self, metrics: _OriginMetrics, started: float, state: Dict[str, Any]):
+        """httpcore trace hook timing the pool wait and any new connection"""
+        def end_wait(now: float) -> None:
+            if state["waiting"]:
+                state["waiting"] = False
+                metrics.active += 1
+                metrics.peak_active = max(metrics.peak_active, metrics.active)
+                waited = (now - started) * 1000
+                metrics.pool_wait_ms_total += waited
+                metrics.pool_wait_ms_max = max(metrics.pool_wait_ms_max, waited)
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            now = time.perf_counter()
+            if event == "connection.connect_tcp.started":
+                end_wait(now)
+                metrics.new_connections += 1
+                state["connect_started"] = now
+            elif event == "connection.start_tls.started":
+                metrics.tls_handshakes += 1
+            elif event.endswith(".send_request_headers.started"):
+                end_wait(now)
+                if state["connect_started"] is not None:
+                    metrics.connect_ms_total += (now - state["connect_started"]) * 1000
+                    state["connect_started"] = None
+
+        return trace
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+        """Send a request and yield the response once its headers arrive"""
+        client = self.client_for(url)
+        metrics = self._metrics[origin_of(url)]
+        state: Dict[str, Any] = {"waiting": True, "connect_started": None}
+        trace = self._tracer(metrics, time.perf_counter(), state)
+        request = client.build_request(method, url, extensions={"trace": trace}, **kwargs)
+        metrics.requests += 1
+        metrics.in_flight += 1
+        try:
+            try:
+                response = await client.send(request, stream=True)
+            except httpx.TimeoutException:
+                metrics.timeouts += 1
+                raise
+            except httpx.HTTPError:
+                metrics.errors += 1
+                raise
+            # Enforced here rather than through httpx, whose read timeout is
+            # fixed per request and still set to the first-byte timeout
+            response.stream = _ChunkTimeoutStream(response.stream, self.read_timeout, request)
+            try:
+                yield response
+            except httpx.TimeoutException:
+                metrics.timeouts += 1
+                raise
+            finally:
+                await response.aclose()
+        finally:
+            metrics.in_flight -= 1
+            if not state["waiting"]:
+                metrics.active -= 1
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        """POST and read the whole body"""
+        async with self.stream("POST", url, **kwargs) as response:
+            await response.aread()
+        return response
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        await asyncio.gather(*(c.aclose() for c in clients.values()), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        max_connections = self.limits.max_connections
+        return {
+            "http2": self.http2,
+            "max_connections": max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry_seconds": self.limits.keepalive_expiry,
+            "origins": {
+                origin: metrics.as_dict(max_connections)
+                for origin, metrics in self._metrics.items()
+            }
+        }
+
+# Global upstream client manager instance
+upstream_clients = UpstreamClientManager(
+    max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY_SECONDS,
+    http2=settings.UPSTREAM_HTTP2,
+    connect_timeout=settings.UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+    write_timeout=settings.UPSTREAM_WRITE_TIMEOUT_SECONDS,
+    pool_timeout=settings.UPSTREAM_POOL_TIMEOUT_SECONDS,
+    first_byte_timeout=settings.UPSTREAM_FIRST_BYTE_TIMEOUT_SECONDS,
+    read_timeout=settings.UPSTREAM_READ_TIMEOUT_SECONDS
+)
@@ -0,0 +1,85 @@
+from typing import Dict, Optional, Tuple
+from datetime import datetime
+import asyncio
+import logging
+import threading
+from app.core.config import settings
+from app.crud.api_key import api_key as api_key_crud
+from app.db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+class APIKeyUsageTracker:
+    """Write-behind buffer for APIKey.usage_count and last_used_at.
+
+    Usage is accumulated per key in memory and written in one batched
+    UPDATE every flush interval and at shutdown, so a crash loses at most
+    one interval of counters.
+    """
+
+    def __init__(self, flush_interval: float = 5.0):
+        self.flush_interval = flush_interval
+        self.pending: Dict[int, Tuple[int, datetime]] = {}
+        self.lock = threading.Lock()
+        self.flush_count = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, api_key_id: int, used_at: Optional[datetime] = None) -> None:
+        used_at = used_at or datetime.utcnow()
+        with self.lock:
+            count, last_used = self.pending.get(api_key_id, (0, used_at))
+            self.pending[api_key_id] = (count + 1, max(last_used, used_at))
+
+    def get_pending(self, api_key_id: int) -> Optional[Tuple[int, datetime]]:
+        with self.lock:
+            return self.pending.get(api_key_id)
+
+    def flush(self) -> int:
+        """Write all pending usage to the database, returns keys flushed"""
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        if not batch:
+            return 0
+
+        db = SessionLocal()
+        try:
+            api_key_crud.record_usage_batch(db, usage=batch)
+            self.flush_count += 1
+            return len(batch)
+        except Exception as e:
+            logger.error(f"Error flushing API key usage: {e}")
+            db.rollback()
+            self._requeue(batch)
+            return 0
+        finally:
+            db.close()
+
+    def _requeue(self, batch: Dict[int, Tuple[int, datetime]]) -> None:
+        with self.lock:
+            for key_id, (count, used_at) in batch.items():
+                pending_count, pending_used = self.pending.get(key_id, (0, used_at))
+                self.pending[key_id] = (pending_count + count, max(pending_used, used_at))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+# Global usage tracker instance
+usage_tracker = APIKeyUsageTracker(
+    flush_interval=settings.API_KEY_USAGE_FLUSH_INTERVAL_SECONDS
+)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+访问日志查询基准测试
+
+在临时 SQLite 库中生成指定行数的访问日志 (分布在 --days 天内),
+分别在旧索引 (单列 user_id / model_id / api_key_id / created_at) 加旧写法
+(func.date(created_at) 过滤) 与新的复合索引加半开区间写法下,
+打印管理端和单用户常用查询的执行计划与耗时。
+
+用法: python scripts/benchmark_access_log_queries.py [--rows 1000000] [--days 90]
+      (完整压测使用 --rows 10000000, 生成数据约需数分钟)
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import and_, create_engine, desc, func, select, text
+
+from app.models.access_log import AccessLog
+from app.crud.access_log import access_log, day_range
+
+USERS = 1000
+MODELS = 5
+KEYS_PER_USER = 3
+
+LEGACY_INDEXES = {
+    "ix_access_logs_user_id": "user_id",
+    "ix_access_logs_model_id": "model_id",
+    "ix_access_logs_api_key_id": "api_key_id",
+}
+
+
+def seed(conn, rows: int, days: int, end: datetime):
+    """用递归 CTE 在库内直接生成数据, 避免逐行插入的开销"""
+    span = days * 86400
+    conn.execute(text(
+        "WITH RECURSIVE seq(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i < :rows - 1) "
+        "INSERT INTO access_logs (user_id, api_key_id, model_id, request_type, status_code, "
+        "latency_ms, prompt_tokens, completion_tokens, total_tokens, created_at) "
+        "SELECT (i * 7919) % :users + 1, ((i * 7919) % :users) * :kpu + i % :kpu + 1, "
+        "i % :models + 1, 'chat', CASE WHEN i % 20 = 0 THEN 500 ELSE 200 END, "
+        "100 + i % 1900, 20, 80, 100, "
+        "datetime(:end, '-' || ((:rows - i) * :span / :rows) || ' seconds') FROM seq"
+    ), {
+        "rows": rows, "users": USERS, "kpu": KEYS_PER_USER, "models": MODELS,
+        "span": span, "end": end.strftime("%Y-%m-%d %H:%M:%S")
+    })
+
+
+def queries(today: date, now: datetime, legacy: bool):
+    start_date = today - timedelta(days=7)
+    start, end = day_range(start_date, today)
+    if legacy:
+        stats = select(
+            func.date(AccessLog.created_at), func.count(AccessLog.id),
+            func.sum(AccessLog.total_tokens), func.avg(AccessLog.latency_ms)
+        ).filter(and_(
+            func.date(AccessLog.created_at) >= start_date,
+            func.date(AccessLog.created_at) <= today
+        )).group_by(func.date(AccessLog.created_at))
+        user_range = func.date(AccessLog.created_at) >= start_date
+    else:
+        stats = access_log._stats_by_date_query(start_date=start_date, end_date=today)
+        user_range = and_(AccessLog.created_at >= start, AccessLog.created_at < end)
+    return {
+        "管理端 7 天统计": stats,
+        "管理端 24 小时请求数": select(func.count()).select_from(AccessLog).filter(
+            AccessLog.created_at >= now - timedelta(days=1)
+        ),
+        "管理端最近日志": select(AccessLog).order_by(desc(AccessLog.created_at)).limit(50),
+        "单用户 7 天请求数": select(func.count()).select_from(AccessLog).filter(
+            AccessLog.user_id == 42, user_range
+        ),
+        "单用户最近日志": select(AccessLog).filter(AccessLog.user_id == 42)
+            .order_by(desc(AccessLog.created_at)).limit(100),
+        "单模型 7 天请求数": select(func.count()).select_from(AccessLog).filter(
+            AccessLog.model_id == 3, user_range
+        ),
+        "单 API 密钥最近日志": select(AccessLog).filter(AccessLog.api_key_id == 42)
+            .order_by(desc(AccessLog.created_at)).limit(100),
+    }
+
+
+def run(conn, label: str, stmts, repeat: int):
+    print(f"\n== {label} ==")
+    for name, stmt in stmts.items():
+        sql = str(stmt.compile(conn, compile_kwargs={"literal_binds": True}))
+        plan = "; ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql))
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(stmt).all()
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        print(f"{name:<14} {elapsed:10.2f} ms   {plan}")
+
+
+def main(rows: int, days: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        AccessLog.__table__.create(bind=engine)
+        now = datetime.utcnow().replace(microsecond=0)
+        with engine.begin() as conn:
+            # 先还原旧版索引布局: 去掉复合索引, 保留 id / created_at 单列索引
+            for index in AccessLog.__table__.indexes:
+                if len(index.columns) > 1:
+                    conn.exec_driver_sql(f"DROP INDEX {index.name}")
+            for name, column in LEGACY_INDEXES.items():
+                conn.exec_driver_sql(f"CREATE INDEX {name} ON access_logs ({column})")
+
+            start = time.perf_counter()
+            seed(conn, rows, days, now)
+            print(f"生成 {rows:,} 行访问日志 ({days} 天), 耗时 {time.perf_counter() - start:.1f} 秒")
+            conn.exec_driver_sql("ANALYZE")
+
+        with engine.connect() as conn:
+            run(conn, "旧索引 + func.date 过滤", queries(now.date(), now, legacy=True), repeat)
+
+        with engine.begin() as conn:
+            start = time.perf_counter()
+            for name in LEGACY_INDEXES:
+                conn.exec_driver_sql(f"DROP INDEX {name}")
+            for index in AccessLog.__table__.indexes:
+                index.create(bind=conn, checkfirst=True)
+            conn.exec_driver_sql("ANALYZE")
+            print(f"\n创建复合索引耗时 {time.perf_counter() - start:.1f} 秒")
+
+        with engine.connect() as conn:
+            run(conn, "复合索引 + 半开区间", queries(now.date(), now, legacy=False), repeat)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="访问日志查询基准测试")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.rows, args.days, args.repeat)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+管理端更新接口 SQL 语句数基准测试
+
+在临时 SQLite 库上启动应用, 统计 PUT /admin/users/{id}、PUT /admin/models/{id}、
+PUT /api-keys/{id} 以及对应创建接口每次请求发出的 SQL 语句数和平均耗时,
+对比旧写法 (jsonable_encoder 序列化整行 + commit + refresh) 与
+UPDATE ... RETURNING / INSERT ... RETURNING 的新写法。
+
+用法: python scripts/benchmark_admin_update_queries.py [--repeat 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'bench.db')}"
+warnings.simplefilter("ignore")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.crud.api_key import CRUDAPIKey
+from app.crud.base import CRUDBase
+from app.db.database import async_engine
+from app.main import app
+from app.models.api_key import APIKey
+
+statements = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+async def legacy_update_async(self, db, *, db_obj, obj_in):
+    """旧版 update_async: 序列化整行做字段过滤, 提交后再 SELECT 一次"""
+    obj_data = jsonable_encoder(db_obj)
+    update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+    for field in obj_data:
+        if field in update_data:
+            setattr(db_obj, field, update_data[field])
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    return db_obj
+
+
+async def legacy_key_create_async(self, db, *, obj_in, user_id):
+    """旧版 API 密钥创建: add + commit 后再 SELECT 一次"""
+    row, raw_key = self._new_key(obj_in, user_id)
+    db_obj = APIKey(**row)
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    return db_obj, raw_key
+
+
+def measure(client: TestClient, method: str, path: str, headers, body_for, repeat: int):
+    global statements
+    statements = 0
+    start = time.perf_counter()
+    for i in range(repeat):
+        r = client.request(method, path(i), json=body_for(i), headers=headers)
+        assert r.status_code == 200, r.text
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    return statements / repeat, elapsed
+
+
+def run(client: TestClient, headers, ids, repeat: int, label: str):
+    user_id, model_id, key_id = ids
+    cases = {
+        "PUT /admin/users/{id}": ("PUT", lambda i: f"/api/v1/admin/users/{user_id}",
+                                  lambda i: {"full_name": f"{label} {i}"}),
+        "PUT /admin/models/{id}": ("PUT", lambda i: f"/api/v1/admin/models/{model_id}",
+                                   lambda i: {"priority": i}),
+        "PUT /api-keys/{id}": ("PUT", lambda i: f"/api/v1/api-keys/{key_id}",
+                               lambda i: {"name": f"{label} {i}"}),
+        "POST /api-keys/": ("POST", lambda i: "/api/v1/api-keys/",
+                            lambda i: {"name": f"{label} {i}"}),
+    }
+    print(f"\n== {label} ==")
+    for name, (method, path, body_for) in cases.items():
+        per_request, elapsed = measure(client, method, path, headers, body_for, repeat)
+        print(f"{name:<24} {per_request:6.1f} 条 SQL/请求   {elapsed:8.2f} ms/请求")
+
+
+def main(repeat: int):
+    with TestClient(app) as client:
+        r = client.post("/api/v1/auth/login", json={"username": "admin", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        user_id = client.get("/api/v1/admin/users", headers=headers).json()[-1]["id"]
+        model_id = client.get("/api/v1/admin/models", headers=headers).json()[0]["id"]
+        key_id = client.post("/api/v1/api-keys/", json={"name": "bench"}, headers=headers).json()["api_key"]["id"]
+        ids = (user_id, model_id, key_id)
+        # 预热认证缓存, 让统计只反映更新本身
+        client.get("/api/v1/users/me", headers=headers)
+
+        current = CRUDBase.update_async, CRUDAPIKey.create_async
+        CRUDBase.update_async, CRUDAPIKey.create_async = legacy_update_async, legacy_key_create_async
+        try:
+            run(client, headers, ids, repeat, "旧写法 (refresh)")
+        finally:
+            CRUDBase.update_async, CRUDAPIKey.create_async = current
+        run(client, headers, ids, repeat, "RETURNING")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="管理端更新接口 SQL 语句数基准测试")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.repeat)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库会话并发基准测试
+
+对比在协程中直接调用同步 Session (阻塞事件循环) 与使用 AsyncSession
+在 N 个并发请求同时执行一条慢查询时的总耗时和吞吐量。
+慢查询用递归 CTE 模拟, 同步版本中所有请求在事件循环上串行执行,
+异步版本在驱动线程 / 连接上执行, 事件循环可以继续调度其他请求。
+
+用法: python scripts/benchmark_async_db.py [--concurrency 20] [--depth 200000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import _async_database_url
+
+SLOW_QUERY = text(
+    "WITH RECURSIVE cnt(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM cnt WHERE x < :depth) "
+    "SELECT SUM(x) FROM cnt"
+)
+
+
+async def ticker(stop: asyncio.Event) -> int:
+    """每毫秒醒来一次, 统计事件循环在测试期间能响应多少次"""
+    ticks = 0
+    while not stop.is_set():
+        await asyncio.sleep(0.001)
+        ticks += 1
+    return ticks
+
+
+async def run_sync(url: str, concurrency: int, depth: int):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(bind=engine)
+
+    async def request():
+        db = SessionLocal()
+        try:
+            return db.execute(SLOW_QUERY, {"depth": depth}).scalar()
+        finally:
+            db.close()
+
+    result = await measure(request, concurrency)
+    engine.dispose()
+    return result
+
+
+async def run_async(url: str, concurrency: int, depth: int):
+    engine = create_async_engine(_async_database_url(url))
+    AsyncSessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession)
+
+    async def request():
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(SLOW_QUERY, {"depth": depth})).scalar()
+
+    result = await measure(request, concurrency)
+    await engine.dispose()
+    return result
+
+
+async def measure(request, concurrency: int):
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    ticks = await tick_task
+    return elapsed, concurrency / elapsed, ticks
+
+
+async def main(concurrency: int, depth: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        print(f"并发请求数: {concurrency}, 递归深度: {depth}")
+        for name, runner in (("sync", run_sync), ("async", run_async)):
+            elapsed, throughput, ticks = await runner(url, concurrency, depth)
+            print(
+                f"{name:<6} 总耗时 {elapsed:8.3f} 秒   吞吐 {throughput:8.1f} 次/秒   "
+                f"事件循环响应 {ticks:6d} 次"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="数据库会话并发基准测试")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=200000)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.depth))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+限流器并发基准测试
+
+对比旧版 (deque + 全局 asyncio.Lock, 每次请求 is_allowed + get_remaining 两次调用)
+与当前 GCRA 限流器在大量不同 key 同时检查时的吞吐量。
+轮数越多, 旧版每个 key 的时间戳队列越长, get_remaining 的线性扫描越慢。
+
+用法: python scripts/benchmark_rate_limiter.py [--keys 10000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict, deque
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.middleware.rate_limit import GCRARateLimiter
+
+
+class LegacyRateLimiter:
+    """旧版实现: 每个 key 一个时间戳队列, 所有 key 共用一把锁"""
+
+    def __init__(self):
+        self.requests = defaultdict(deque)
+        self.lock = asyncio.Lock()
+
+    async def is_allowed(self, key: str, limit: int = 60, window: int = 60) -> bool:
+        current_time = time.time()
+        window_start = current_time - window
+        async with self.lock:
+            request_times = self.requests[key]
+            while request_times and request_times[0] < window_start:
+                request_times.popleft()
+            if len(request_times) >= limit:
+                return False
+            request_times.append(current_time)
+            return True
+
+    async def get_remaining(self, key: str, limit: int = 60, window: int = 60) -> int:
+        current_time = time.time()
+        window_start = current_time - window
+        async with self.lock:
+            request_times = self.requests[key]
+            current_requests = sum(1 for t in request_times if t >= window_start)
+            return max(0, limit - current_requests)
+
+
+async def legacy_check(limiter: LegacyRateLimiter, key: str):
+    await limiter.is_allowed(key)
+    await limiter.get_remaining(key)
+
+
+async def gcra_check(limiter: GCRARateLimiter, key: str):
+    await limiter.check(key, limit=60, period=60)
+
+
+async def run(name: str, limiter, check, keys: int, rounds: int):
+    key_names = [f"api_key_{i}" for i in range(keys)]
+
+    # 并发: 每轮所有 key 同时发起检查
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(check(limiter, k) for k in key_names))
+    concurrent = keys * rounds / (time.perf_counter() - start)
+
+    # 顺序: 去掉任务调度开销, 只看限流器本身的单次检查成本
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for k in key_names:
+            await check(limiter, k)
+    sequential = keys * rounds / (time.perf_counter() - start)
+
+    print(f"{name:<8} 并发 {concurrent:12,.0f} 次/秒   顺序 {sequential:12,.0f} 次/秒")
+    return concurrent, sequential
+
+
+async def main(keys: int, rounds: int):
+    print(f"并发 key 数: {keys}, 轮数: {rounds}")
+    legacy = await run("legacy", LegacyRateLimiter(), legacy_check, keys, rounds)
+    gcra = await run("gcra", GCRARateLimiter(), gcra_check, keys, rounds)
+    print(f"提升: 并发 {gcra[0] / legacy[0]:.2f}x, 顺序 {gcra[1] / legacy[1]:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="限流器并发基准测试")
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.keys, args.rounds))
@@ -13,6 +13,7 @@ from datetime import datetime, timedelta
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.db.database import SessionLocal, engine
 from app.db.database import Base
@@ -22,6 +23,7 @@ from app.models.model import Model
 from app.models.access_log import AccessLog
 from app.core.security import get_password_hash, generate_api_key
 from app.crud import user as user_crud, api_key as api_key_crud, model as model_crud
+from app.crud import usage_stat as usage_stat_crud
 from app.schemas.user import UserCreate
 from app.schemas.api_key import APIKeyCreate
 from app.schemas.model import ModelCreate
@@ -40,25 +42,16 @@ def init_demo_data():
     db: Session = SessionLocal()
     
     try:
-        # 1. 创建管理员用户
-        print("创建管理员用户...")
-        admin_user = user_crud.get_by_username(db, username="admin")
-        if not admin_user:
-            admin_data = UserCreate(
-                username="admin",
-                email="admin@example.com",
-                password="admin123",
-                full_name="系统管理员",
-                role="admin"
-            )
-            admin_user = user_crud.create(db, obj_in=admin_data)
-            print(f"管理员用户创建成功: {admin_user.username}")
-        else:
-            print(f"管理员用户已存在: {admin_user.username}")
-        
-        # 2. 创建普通用户
-        print("创建普通用户...")
+        # 1. 创建管理员和普通用户 (密码并行哈希, 批量插入)
+        print("创建用户...")
         demo_users = [
+            {
+                "username": "admin",
+                "email": "admin@example.com",
+                "password": "admin123",
+                "full_name": "系统管理员",
+                "role": "admin"
+            },
             {
                 "username": "demo_user",
                 "email": "demo@example.com",
@@ -75,29 +68,29 @@ def init_demo_data():
             }
         ]
         
-        for user_data in demo_users:
-            existing_user = user_crud.get_by_username(db, username=user_data["username"])
-            if not existing_user:
-                user_create = UserCreate(**user_data)
-                user = user_crud.create(db, obj_in=user_create)
-                print(f"用户创建成功: {user.username}")
-            else:
-                print(f"用户已存在: {user_data['username']}")
+        existing_usernames = set(db.execute(
+            select(User.username).filter(User.username.in_([u["username"] for u in demo_users]))
+        ).scalars())
+        for username in sorted(existing_usernames):
+            print(f"用户已存在: {username}")
+        new_users = [UserCreate(**u) for u in demo_users if u["username"] not in existing_usernames]
+        for user in user_crud.create_many(db, objs_in=new_users):
+            print(f"用户创建成功: {user.username}")
         
-        # 3. 创建API密钥
+        # 2. 为还没有密钥的用户批量创建API密钥
         print("创建API密钥...")
         users = user_crud.get_multi(db)
-        for user in users:
-            existing_keys = api_key_crud.get_by_user(db, user_id=user.id)
-            if not existing_keys:
-                api_key_data = APIKeyCreate(
-                    name=f"{user.username}-Key",
-                    user_id=user.id
-                )
-                api_key, raw_key = api_key_crud.create(db, obj_in=api_key_data, user_id=user.id)
-                print(f"API密钥创建成功: {user.username} -> {api_key.key_prefix}***")
+        users_with_keys = set(db.execute(select(APIKey.user_id).distinct()).scalars())
+        keyless_users = [u for u in users if u.id not in users_with_keys]
+        created_keys = api_key_crud.create_many(
+            db,
+            objs_in=[APIKeyCreate(name=f"{u.username}-Key") for u in keyless_users],
+            user_ids=[u.id for u in keyless_users]
+        )
+        for user, (api_key, raw_key) in zip(keyless_users, created_keys):
+            print(f"API密钥创建成功: {user.username} -> {api_key.key_prefix}***")
         
-        # 4. 创建模型配置
+        # 3. 创建模型配置
         print("创建模型配置...")
         demo_models = [
             {
@@ -160,16 +153,16 @@ def init_demo_data():
             }
         ]
         
-        for model_data in demo_models:
-            existing_model = model_crud.get_by_name(db, name=model_data["name"])
-            if not existing_model:
-                model_create = ModelCreate(**model_data)
-                model = model_crud.create(db, obj_in=model_create)
-                print(f"模型配置创建成功: {model.name}")
-            else:
-                print(f"模型配置已存在: {model_data['name']}")
+        existing_models = set(db.execute(
+            select(Model.name).filter(Model.name.in_([m["name"] for m in demo_models]))
+        ).scalars())
+        for name in sorted(existing_models):
+            print(f"模型配置已存在: {name}")
+        new_models = [ModelCreate(**m) for m in demo_models if m["name"] not in existing_models]
+        for model in model_crud.create_many(db, objs_in=new_models):
+            print(f"模型配置创建成功: {model.name}")
         
-        # 5. 创建演示访问日志
+        # 4. 创建演示访问日志
         print("创建演示访问日志...")
         
         # 获取用户和模型
@@ -240,6 +233,10 @@ def init_demo_data():
             
             db.commit()
             print(f"创建了50条演示访问日志")
+            
+            # 日志直接写库, 绕过了后台写入器, 需要重算统计汇总
+            usage_stat_crud.rebuild(db)
+            print("已重建用量统计汇总")
         
         db.commit()
         print("演示数据初始化完成！")
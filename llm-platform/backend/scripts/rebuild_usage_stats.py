@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用量统计汇总重建脚本
+
+根据 access_logs 重算 usage_stats (按 用户/模型/日期 汇总)。
+正常运行时汇总由访问日志后台写入器随日志一起增量更新,
+仅在直接改动过 access_logs 的数据 (手工导入、修复) 后需要执行。
+默认只重算 access_logs 中仍然存在的日期, 已归档日期的汇总保持不变。
+
+用法: python scripts/rebuild_usage_stats.py [--start 2024-01-01] [--end 2024-01-31]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.database import SessionLocal
+from app.crud.usage_stat import usage_stat
+
+
+def rebuild_usage_stats(start_date=None, end_date=None):
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        total = usage_stat.rebuild(db, start_date=start_date, end_date=end_date)
+        print(f"已根据 {total} 条访问日志重建用量统计, 耗时 {time.perf_counter() - start:.2f} 秒")
+    except Exception as e:
+        print(f"重建失败: {str(e)}")
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="用量统计汇总重建")
+    parser.add_argument("--start", type=date.fromisoformat, help="起始日期 (含), 默认为最早的访问日志")
+    parser.add_argument("--end", type=date.fromisoformat, help="结束日期 (含), 默认为最新的访问日志")
+    args = parser.parse_args()
+    rebuild_usage_stats(args.start, args.end)
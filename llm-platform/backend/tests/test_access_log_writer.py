@@ -0,0 +1,85 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.services.access_log_writer as writer_module
+from app.crud.access_log import access_log as access_log_crud
+from app.db.database import Base
+from app.models.access_log import AccessLog
+from app.models.usage_stat import UsageStat
+from app.services.access_log_writer import AccessLogWriter
+
+
+def row(user_id=1, **fields):
+    return {
+        "user_id": user_id, "api_key_id": 1, "model_id": 1, "request_type": "chat",
+        "status_code": 200, "latency_ms": 10, "total_tokens": 10, **fields
+    }
+
+
+def run(tmp_path, monkeypatch, body):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'logs.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        monkeypatch.setattr(writer_module, "AsyncSessionLocal", sessions)
+        try:
+            await body(sessions)
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+
+async def counts(sessions):
+    async with sessions() as db:
+        logs = (await db.execute(select(AccessLog.user_id))).scalars().all()
+        requests = (await db.execute(select(UsageStat.request_count))).scalars().all()
+    return sorted(logs), sum(requests)
+
+
+def test_failed_commit_is_retried_without_losing_rows(tmp_path, monkeypatch):
+    async def body(sessions):
+        create = access_log_crud.create_logs_batch_async
+        calls = []
+
+        async def flaky_create(db, *, rows):
+            calls.append(len(rows))
+            if len(calls) == 1:
+                raise RuntimeError("database is locked")
+            return await create(db, rows=rows)
+
+        monkeypatch.setattr(access_log_crud, "create_logs_batch_async", flaky_create)
+        writer = AccessLogWriter(batch_size=10, retry_delay=0)
+        for user_id in range(5):
+            assert await writer.submit(**row(user_id))
+        assert await writer.flush() == 5
+        assert calls == [5, 5]
+        assert await counts(sessions) == ([0, 1, 2, 3, 4], 5)
+        assert (writer.written, writer.failed, writer.write_errors, writer.dropped) == (5, 0, 1, 0)
+    run(tmp_path, monkeypatch, body)
+
+
+def test_bad_row_only_loses_itself(tmp_path, monkeypatch):
+    async def body(sessions):
+        writer = AccessLogWriter(batch_size=10, max_retries=1, retry_delay=0)
+        await writer.submit(**row(1))
+        await writer.submit(**row(2, status_code=None))  # Violates NOT NULL
+        await writer.submit(**row(3))
+        assert await writer.flush() == 2
+        # Rows and their rollups were both kept
+        assert await counts(sessions) == ([1, 3], 2)
+        assert writer.failed == 1 and writer.dropped == 0
+        assert writer.write_errors == 3  # Two batch attempts and the bad row on its own
+    run(tmp_path, monkeypatch, body)
+
+
+def test_queue_full_is_counted_apart_from_write_failures(tmp_path, monkeypatch):
+    async def body(sessions):
+        writer = AccessLogWriter(queue_size=1, batch_size=10)
+        assert await writer.submit(**row(1))
+        assert not await writer.submit(**row(2))
+        assert await writer.flush() == 1
+        assert writer.stats()["dropped"] == 1 and writer.stats()["failed"] == 0
+    run(tmp_path, monkeypatch, body)
@@ -0,0 +1,43 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.security import get_password_hash, hash_api_key
+from app.crud.api_key import api_key
+from app.db.database import Base
+from app.models.api_key import APIKey
+from app.schemas.api_key import APIKeyCreate
+
+
+def make_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'keys.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_verify_key_is_one_digest_lookup(tmp_path):
+    db = make_session(tmp_path)
+    created, raw = api_key.create(db, obj_in=APIKeyCreate(name="k"), user_id=1)
+    api_key.create(db, obj_in=APIKeyCreate(name="other"), user_id=1)
+
+    assert created.key_hash == hash_api_key(raw) and raw not in created.key_hash
+    assert api_key.verify_key(db, api_key=raw).id == created.id
+    assert api_key.verify_key(db, api_key=raw[:-1] + ("x" if raw[-1] != "x" else "y")) is None
+
+    created.is_active = False
+    db.commit()
+    assert api_key.verify_key(db, api_key=raw) is None
+
+
+def test_legacy_bcrypt_key_is_rehashed_on_first_use(tmp_path, monkeypatch):
+    db = make_session(tmp_path)
+    raw = "llm_legacykey0123456789"
+    db.add(APIKey(user_id=1, key_hash=get_password_hash(raw), key_prefix=raw[:8] + "...", name="old"))
+    db.commit()
+
+    assert api_key.verify_key(db, api_key="llm_legacykey-wrong") is None
+    key_obj = api_key.verify_key(db, api_key=raw)
+    assert key_obj is not None and key_obj.key_hash == hash_api_key(raw)
+
+    # From now on the digest lookup finds it, bcrypt is never consulted again
+    monkeypatch.setattr(api_key, "_verify_legacy_key", None)
+    assert api_key.verify_key(db, api_key=raw).id == key_obj.id
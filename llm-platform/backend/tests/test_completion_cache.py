@@ -0,0 +1,78 @@
+import asyncio
+import os
+import time
+
+from app.schemas.chat import (
+    ChatCompletionChoice, ChatCompletionResponse, ChatCompletionUsage, ChatMessage, MessageRole
+)
+from app.services.completion_cache import CompletionCache
+
+
+def response(content="hello"):
+    return ChatCompletionResponse(
+        id="chatcmpl-1",
+        created=0,
+        model="m",
+        choices=[ChatCompletionChoice(
+            index=0, message=ChatMessage(role=MessageRole.ASSISTANT, content=content),
+            finish_reason="stop"
+        )],
+        usage=ChatCompletionUsage(prompt_tokens=1, completion_tokens=1, total_tokens=2)
+    )
+
+
+def disk_files(cache):
+    return sorted(
+        name for _, _, files in os.walk(cache.disk_dir) for name in files if name.endswith(".json")
+    )
+
+
+def age(cache, key, seconds):
+    path = cache._path(key)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_sweep_removes_expired_and_oldest_files(tmp_path):
+    async def main():
+        cache = CompletionCache(disk_dir=str(tmp_path), disk_ttl=100, disk_sweep_interval=3600)
+        for i in range(4):
+            await cache.set(f"k{i}", response("x" * 100))
+        await cache._sweep_task
+        age(cache, "k0", 200)  # Expired
+        age(cache, "k1", 50)  # Oldest live entry
+        size = os.path.getsize(cache._path("k2"))
+        cache.disk_max_bytes = 2 * size
+        cache._sweep()
+        assert disk_files(cache) == ["k2.json", "k3.json"]
+        assert cache.disk_evictions == 2
+        assert cache.disk_bytes == 2 * size
+    asyncio.run(main())
+
+
+def test_writes_sweep_at_most_once_per_interval(tmp_path):
+    async def main():
+        cache = CompletionCache(disk_dir=str(tmp_path), disk_max_bytes=1, disk_sweep_interval=3600)
+        await cache.set("k0", response())
+        await cache._sweep_task
+        # The first write swept and evicted down to the cap
+        assert disk_files(cache) == [] and cache.disk_sweeps == 1
+        await cache.set("k1", response())
+        await asyncio.sleep(0)
+        assert disk_files(cache) == ["k1.json"] and cache.disk_sweeps == 1
+    asyncio.run(main())
+
+
+def test_disk_hit_is_promoted_with_remaining_ttl(tmp_path):
+    async def main():
+        writer = CompletionCache(disk_dir=str(tmp_path), disk_ttl=100, disk_sweep_interval=3600)
+        await writer.set("k", response())
+        await writer._sweep_task
+        age(writer, "k", 99.5)
+
+        reader = CompletionCache(ttl=3600, disk_dir=str(tmp_path), disk_ttl=100)
+        assert await reader.get("k") is not None
+        assert reader.disk_hits == 1
+        expires_at, _ = reader.memory._data["k"]
+        assert expires_at - time.monotonic() <= 0.5
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.services.model_registry as registry_module
+from app.crud.model import model as model_crud
+from app.db.database import Base
+from app.schemas.model import ModelCreate, ModelUpdate
+from app.services.model_registry import ModelRegistry
+
+
+def run(tmp_path, monkeypatch, body):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'models.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        monkeypatch.setattr(registry_module, "AsyncSessionLocal", sessions)
+        try:
+            await body(sessions)
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+
+def test_other_workers_pick_up_admin_changes_by_version(tmp_path, monkeypatch):
+    async def body(sessions):
+        # Two workers: the one serving the admin request and one that polls
+        admin, worker = ModelRegistry(), ModelRegistry()
+        assert await worker.refresh_if_changed()
+        assert worker.get("gpt-x") is None and worker.version == 0
+
+        async with sessions() as db:
+            created = await model_crud.create_async(db, obj_in=ModelCreate(
+                name="gpt-x", display_name="GPT X", provider="OpenAI", max_tokens=100,
+                model_metadata={"fallbacks": ["gpt-y"]}
+            ))
+            await admin.bump(db)
+        assert admin.get("gpt-x").max_tokens == 100
+        assert worker.get("gpt-x") is None
+
+        assert await worker.refresh_if_changed()
+        assert worker.version == 1 and worker.get("gpt-x").max_tokens == 100
+        # Unchanged version: a single-row read, no reload
+        reloads = worker.reloads
+        assert not await worker.refresh_if_changed()
+        assert worker.reloads == reloads
+
+        async with sessions() as db:
+            db_model = await model_crud.get_async(db, id=created.id)
+            await model_crud.update_async(db, db_obj=db_model, obj_in=ModelUpdate(max_tokens=200))
+            await admin.bump(db)
+        assert await worker.refresh_if_changed()
+        assert worker.version == 2 and worker.get("gpt-x").max_tokens == 200
+
+        # Descriptors are shared by every request, so they are read-only
+        descriptor = worker.get("gpt-x")
+        with pytest.raises(TypeError):
+            descriptor.model_metadata["fallbacks"] = []
+        with pytest.raises(AttributeError):
+            descriptor.max_tokens = 1
+    run(tmp_path, monkeypatch, body)
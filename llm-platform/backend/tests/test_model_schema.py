@@ -0,0 +1,40 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.schemas.model import Model
+
+
+def db_model(model_metadata):
+    return SimpleNamespace(
+        id=1, name="gpt-x", display_name="GPT X", provider="OpenAI", endpoint_url=None,
+        is_active=True, priority=1, max_tokens=10, description=None,
+        model_metadata=model_metadata, created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1)
+    )
+
+
+def test_deployment_api_keys_are_redacted():
+    metadata = {
+        "fallbacks": ["gpt-y"],
+        "deployments": [
+            {"name": "east", "endpoint_url": "http://east", "api_key": "sk-secret", "priority": 2},
+            {"name": "west", "api_key_env": "WEST_KEY"}
+        ]
+    }
+    body = Model.model_validate(db_model(metadata)).model_dump_json()
+    assert "sk-secret" not in body
+
+    dumped = Model.model_validate(db_model(metadata)).model_metadata
+    assert dumped == {
+        "fallbacks": ["gpt-y"],
+        "deployments": [
+            {"name": "east", "endpoint_url": "http://east", "priority": 2},
+            {"name": "west", "api_key_env": "WEST_KEY"}
+        ]
+    }
+    # The stored metadata is left alone, the registry still routes with the key
+    assert metadata["deployments"][0]["api_key"] == "sk-secret"
+
+
+def test_metadata_without_deployments_is_unchanged():
+    assert Model.model_validate(db_model(None)).model_metadata is None
+    assert Model.model_validate(db_model({"rate_limits": {}})).model_metadata == {"rate_limits": {}}
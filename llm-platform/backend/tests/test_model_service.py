@@ -0,0 +1,54 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import app.services.model_service as model_service
+from app.schemas.chat import ChatCompletionRequest
+from app.services.circuit_breaker import UpstreamUnavailableError
+from app.services.load_balancer import LoadBalancer
+from app.services.model_registry import ModelDescriptor, model_registry
+
+
+def descriptor(id, name, fallbacks=None):
+    return ModelDescriptor.from_model(SimpleNamespace(
+        id=id, name=name, display_name=name, provider="OpenAI",
+        endpoint_url="http://127.0.0.1:1/v1/chat/completions", is_active=True, priority=1,
+        max_tokens=10, description=None,
+        model_metadata={"fallbacks": fallbacks} if fallbacks else {}
+    ))
+
+
+@pytest.fixture
+def open_circuits(monkeypatch):
+    primary, fallback = descriptor(1, "gpt-x", ["gpt-y"]), descriptor(2, "gpt-y")
+    monkeypatch.setattr(model_registry, "_by_name", {m.name: m for m in (primary, fallback)})
+    balancer = LoadBalancer(open_seconds=30)
+    monkeypatch.setattr(model_service, "load_balancer", balancer)
+    for model, opened_ago in ((primary, 0), (fallback, 20)):
+        breaker = balancer._state(model.name, model.deployments[0]).breaker
+        breaker.state = breaker.OPEN
+        breaker.opened_at = time.monotonic() - opened_ago
+    return primary
+
+
+def test_unavailable_error_carries_soonest_retry_after(open_circuits):
+    service = model_service.ModelService()
+    request = ChatCompletionRequest(model="gpt-x", messages=[{"role": "user", "content": "hi"}])
+    with pytest.raises(UpstreamUnavailableError) as exc:
+        asyncio.run(service.chat_completion(request, open_circuits))
+    # The fallback's breaker re-probes first, in about 10 of its 30 seconds
+    assert 9 < exc.value.retry_after <= 10
+
+
+def test_stream_unavailable_error_carries_retry_after(open_circuits):
+    service = model_service.ModelService()
+    request = ChatCompletionRequest(model="gpt-x", messages=[{"role": "user", "content": "hi"}])
+
+    async def consume():
+        return [chunk async for chunk in service.chat_completion_stream(request, open_circuits)]
+
+    with pytest.raises(UpstreamUnavailableError) as exc:
+        asyncio.run(consume())
+    assert 9 < exc.value.retry_after <= 10
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi import Response
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.api_keys import list_api_keys
+from app.api.v1.pagination import NEXT_CURSOR_HEADER
+from app.db.database import Base
+from app.models.api_key import APIKey
+
+
+def key(i, user_id=1, created_at=None):
+    return APIKey(
+        user_id=user_id, key_hash=f"hash-{i}", key_prefix=f"p{i}", name=f"key-{i}",
+        created_at=created_at
+    )
+
+
+def run(tmp_path, body):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'keys.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        try:
+            async with sessions() as db:
+                # Runs of equal created_at straddle the page boundaries, both
+                # for server defaults and for explicit Python values
+                same = datetime(2024, 1, 1, 12, 0, 0)
+                db.add_all([key(i) for i in range(7)])
+                db.add_all([key(i, created_at=same) for i in range(7, 14)])
+                db.add_all([key(i, user_id=2) for i in range(14, 17)])
+                await db.commit()
+                await body(db)
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+
+async def list_keys(db, cursor=None, limit=None):
+    response = Response()
+    user = SimpleNamespace(id=1)
+    items = await list_api_keys(response, db=db, current_user=user, cursor=cursor, limit=limit)
+    return items, response
+
+
+def test_cursor_walk_returns_every_key_once(tmp_path):
+    async def body(db):
+        names, cursor, pages = [], None, 0
+        while True:
+            items, response = await list_keys(db, cursor, 3)
+            names += [k.name for k in items]
+            pages += 1
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+        assert pages == 5
+        assert sorted(names) == sorted(f"key-{i}" for i in range(14))
+    run(tmp_path, body)
+
+
+def test_list_without_cursor_or_limit_is_not_truncated(tmp_path):
+    async def body(db):
+        db.add_all([key(i) for i in range(100, 250)])
+        await db.commit()
+        items, response = await list_keys(db)
+        assert len(items) == 164
+        assert NEXT_CURSOR_HEADER not in response.headers
+    run(tmp_path, body)
@@ -0,0 +1,213 @@
+import asyncio
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.middleware import rate_limit
+from app.middleware.rate_limit import GCRARateLimiter, RateLimitCheck, RedisRateLimiter
+from app.schemas.chat import ChatCompletionRequest, ChatMessage, MessageRole
+
+
+def memory_limiter():
+    return GCRARateLimiter(max_keys=1000)
+
+
+def redis_limiter(server=None):
+    server = server or fakeredis.FakeServer()
+    return RedisRateLimiter(client=fakeredis.aioredis.FakeRedis(server=server))
+
+
+BACKENDS = [memory_limiter, redis_limiter]
+
+
+def run(limiter, body):
+    """Run body(limiter) on one event loop, the Redis client is bound to it"""
+    async def main():
+        try:
+            await body(limiter)
+        finally:
+            if isinstance(limiter, RedisRateLimiter):
+                # Every Redis test must have talked to (fake) Redis
+                assert limiter.fallback_checks == 0
+                await limiter.close()
+    asyncio.run(main())
+
+
+def make_request():
+    return Request({
+        "type": "http", "method": "POST", "path": "/", "headers": [],
+        "client": ("127.0.0.1", 1234)
+    })
+
+
+def chat_request(max_tokens):
+    return ChatCompletionRequest(
+        model="m",
+        messages=[ChatMessage(role=MessageRole.USER, content="hello")],
+        max_tokens=max_tokens
+    )
+
+
+@pytest.mark.parametrize("make_limiter", BACKENDS)
+def test_cost_above_burst_on_fresh_key_is_denied(make_limiter):
+    async def body(limiter):
+        result = await limiter.check("tokens_api_key_1", 1000, 60, None, 5000)
+        assert not result.allowed
+        assert result.retry_after > 0
+        # Nothing was consumed, a request that fits still goes through
+        assert (await limiter.check("tokens_api_key_1", 1000, 60, None, 10)).allowed
+    run(make_limiter(), body)
+
+
+@pytest.mark.parametrize("make_limiter", BACKENDS)
+def test_reservation_above_burst_returns_429(make_limiter, monkeypatch):
+    async def body(limiter):
+        monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+        monkeypatch.setattr(settings, "TOKEN_RATE_LIMIT_PER_MINUTE", 1000)
+        db_model = SimpleNamespace(id=1, name="m", model_metadata={})
+        with pytest.raises(HTTPException) as exc:
+            await rate_limit.reserve_tokens(make_request(), chat_request(200000), db_model, 1, 1)
+        assert exc.value.status_code == 429
+        assert "Retry-After" in exc.value.headers
+    run(make_limiter(), body)
+
+
+@pytest.mark.parametrize("make_limiter", BACKENDS)
+def test_forced_check_consumes_past_burst(make_limiter):
+    async def body(limiter):
+        assert (await limiter.check("k", 1000, 60, None, 900)).allowed
+        assert not (await limiter.check("k", 1000, 60, None, 5000)).allowed
+        await limiter.check("k", 1000, 60, None, 5000, True)
+        # The overrun was charged: even a single token is now denied for minutes
+        result = await limiter.check("k", 1000, 60, None, 1)
+        assert not result.allowed
+        assert result.retry_after > 4 * 60
+    run(make_limiter(), body)
+
+
+@pytest.mark.parametrize("make_limiter", BACKENDS)
+def test_settle_charges_overrun_in_one_call(make_limiter, monkeypatch):
+    async def body(limiter):
+        monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+        checks = [RateLimitCheck("a", 1000, 60, None, 900), RateLimitCheck("b", 1000, 60, None, 900)]
+        await limiter.check_many(checks)
+
+        calls = []
+        check_many = limiter.check_many
+
+        async def counting_check_many(batch):
+            calls.append(batch)
+            return await check_many(batch)
+
+        monkeypatch.setattr(limiter, "check_many", counting_check_many)
+        await rate_limit.TokenReservation(checks, 900).settle(5900)
+        assert len(calls) == 1
+        assert not (await check_many([RateLimitCheck("a", 1000, 60, None, 1)]))[0].allowed
+        assert not (await check_many([RateLimitCheck("b", 1000, 60, None, 1)]))[0].allowed
+    run(make_limiter(), body)
+
+
+@pytest.mark.parametrize("make_limiter", BACKENDS)
+def test_settle_refunds_unused_tokens(make_limiter, monkeypatch):
+    async def body(limiter):
+        monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+        check = RateLimitCheck("a", 1000, 60, None, 1000)
+        assert (await limiter.check(*check)).allowed
+        await rate_limit.TokenReservation([check], 1000).settle(100)
+        assert (await limiter.check("a", 1000, 60, None, 800)).allowed
+    run(make_limiter(), body)
+
+
+def test_redis_limiters_share_one_limit():
+    server = fakeredis.FakeServer()
+    second = redis_limiter(server)
+
+    async def body(first):
+        results = [
+            await (first if i % 2 else second).check("api_key_1", 10, 60) for i in range(12)
+        ]
+        assert [r.allowed for r in results] == [True] * 10 + [False] * 2
+        assert results[9].remaining == 0
+        assert second.fallback_checks == 0
+        await second.close()
+    run(redis_limiter(server), body)
+
+
+def test_redis_check_many_is_one_pipeline(monkeypatch):
+    async def body(limiter):
+        executed = []
+        pipeline = limiter.client.pipeline
+
+        def counting_pipeline(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            async def counting_execute(*a, **kw):
+                executed.append(len(pipe.command_stack))
+                return await execute(*a, **kw)
+
+            pipe.execute = counting_execute
+            return pipe
+
+        monkeypatch.setattr(limiter.client, "pipeline", counting_pipeline)
+        results = await limiter.check_many([
+            RateLimitCheck("a", 5, 1), RateLimitCheck("b", 100, 60, None, 30), RateLimitCheck("a", 5, 1)
+        ])
+        assert executed == [3]
+        assert [r.allowed for r in results] == [True, True, True]
+        assert [r.remaining for r in results] == [4, 70, 3]
+    run(redis_limiter(), body)
+
+
+def test_redis_reloads_script_after_noscript():
+    async def body(limiter):
+        assert (await limiter.check("k", 10, 60)).allowed
+        # A Redis restart or SCRIPT FLUSH empties the script cache
+        await limiter.client.script_flush()
+        result = await limiter.check("k", 10, 60)
+        assert result.allowed and result.remaining == 8
+    run(redis_limiter(), body)
+
+
+def test_redis_unreachable_falls_back_to_memory():
+    async def main():
+        limiter = RedisRateLimiter(url="redis://127.0.0.1:1/0")
+        results = [await limiter.check("k", 2, 60) for _ in range(3)]
+        assert [r.allowed for r in results] == [True, True, False]
+        assert limiter.fallback_checks == 3
+        assert limiter.retry_at > 0
+        await limiter.close()
+    asyncio.run(main())
+
+
+def test_redis_client_has_timeouts():
+    limiter = RedisRateLimiter(url="redis://127.0.0.1:1/0")
+    kwargs = limiter.client.connection_pool.connection_kwargs
+    assert kwargs["socket_connect_timeout"] == settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS
+    assert kwargs["socket_timeout"] == settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS
+
+
+@pytest.mark.parametrize("make_limiter", BACKENDS)
+def test_request_burst_setting_does_not_cap_token_budgets(make_limiter, monkeypatch):
+    async def body(limiter):
+        monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+        monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 10)
+        monkeypatch.setattr(settings, "TOKEN_RATE_LIMIT_PER_MINUTE", 100000)
+        db_model = SimpleNamespace(id=1, name="m", model_metadata={
+            "rate_limits": {"tokens_per_minute": 40000, "requests_per_minute": 20}
+        })
+        request = make_request()
+        reservation = await rate_limit.reserve_tokens(request, chat_request(500), db_model, 1, 1)
+        assert reservation.reserved > 500
+        assert int(request.state.rate_limit_headers["X-RateLimit-Remaining-Tokens"]) > 39000
+        # The per-model request budget gets its own burst of 20, not 10
+        for _ in range(19):
+            await rate_limit.reserve_tokens(request, chat_request(1), db_model, 1, 1)
+        with pytest.raises(HTTPException) as exc:
+            await rate_limit.reserve_tokens(request, chat_request(1), db_model, 1, 1)
+        assert exc.value.status_code == 429
+    run(make_limiter(), body)
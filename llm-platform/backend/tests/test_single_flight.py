@@ -0,0 +1,125 @@
+import asyncio
+
+from app.schemas.chat import (
+    ChatCompletionChoice, ChatCompletionChunk, ChatCompletionChunkChoice, ChatCompletionChunkDelta,
+    ChatCompletionResponse, ChatCompletionUsage, ChatMessage, MessageRole
+)
+from app.services.single_flight import SingleFlight
+
+
+def response():
+    return ChatCompletionResponse(
+        id="chatcmpl-leader", created=0, model="m",
+        choices=[ChatCompletionChoice(
+            index=0, message=ChatMessage(role=MessageRole.ASSISTANT, content="hi"), finish_reason="stop"
+        )],
+        usage=ChatCompletionUsage(prompt_tokens=1, completion_tokens=1, total_tokens=2)
+    )
+
+
+def chunk(content):
+    return ChatCompletionChunk(
+        id="chatcmpl-leader", created=0, model="m",
+        choices=[ChatCompletionChunkChoice(index=0, delta=ChatCompletionChunkDelta(content=content))]
+    )
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    async def main():
+        flight = SingleFlight()
+        calls = []
+        release = asyncio.Event()
+
+        async def upstream():
+            calls.append(1)
+            await release.wait()
+            return response()
+
+        callers = [asyncio.create_task(flight.call("k", upstream)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers)
+
+        assert len(calls) == 1
+        assert [shared for _, shared in results] == [False, True, True]
+        assert results[0][0].id == "chatcmpl-leader"
+        # Followers get an id of their own, the content is the leader's
+        assert len({r.id for r, _ in results}) == 3
+        assert all(r.choices == results[0][0].choices for r, _ in results)
+
+        # The key is forgotten once the call finished, a later request calls again
+        assert not (await flight.call("k", upstream))[1]
+        assert len(calls) == 2
+    asyncio.run(main())
+
+
+def test_call_failure_reaches_every_caller():
+    async def main():
+        flight = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(
+            *[flight.call("k", upstream) for _ in range(2)], return_exceptions=True
+        )
+        assert [str(r) for r in results] == ["upstream down"] * 2
+        assert flight.stats()["in_flight_calls"] == 0
+    asyncio.run(main())
+
+
+def test_late_stream_subscriber_gets_replay_then_live_chunks():
+    async def main():
+        flight = SingleFlight()
+        opened = []
+        sent_first = asyncio.Event()
+        release = asyncio.Event()
+
+        async def upstream():
+            opened.append(1)
+            yield chunk("a")
+            sent_first.set()
+            await release.wait()
+            yield chunk("b")
+
+        async def read(subscription):
+            return [c async for c in subscription]
+
+        first = flight.stream("k", upstream)
+        leader = asyncio.create_task(read(first))
+        await sent_first.wait()
+        second = flight.stream("k", upstream)
+        follower = asyncio.create_task(read(second))
+        await asyncio.sleep(0)
+        release.set()
+        leader_chunks, follower_chunks = await leader, await follower
+
+        assert len(opened) == 1
+        assert not first.shared and second.shared
+        assert [c.choices[0].delta.content for c in follower_chunks] == ["a", "b"]
+        assert {c.id for c in leader_chunks} == {"chatcmpl-leader"}
+        assert len({c.id for c in follower_chunks}) == 1
+        assert follower_chunks[0].id != "chatcmpl-leader"
+    asyncio.run(main())
+
+
+def test_last_subscriber_leaving_closes_upstream_stream():
+    async def main():
+        flight = SingleFlight()
+        closed = asyncio.Event()
+
+        async def upstream():
+            try:
+                yield chunk("a")
+                await asyncio.sleep(3600)
+                yield chunk("b")
+            finally:
+                closed.set()
+
+        subscription = flight.stream("k", upstream).__aiter__()
+        assert (await subscription.__anext__()).choices[0].delta.content == "a"
+        await subscription.aclose()
+        await asyncio.wait_for(closed.wait(), 1)
+        assert flight.stats()["in_flight_streams"] == 0
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services.upstream_clients import UpstreamClientManager, origin_of
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Waits header_delay before the headers, then sends chunks chunk_delay apart"""
+
+    protocol_version = "HTTP/1.1"
+    header_delay = 0.0
+    chunk_delays = ()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.header_delay)
+        self.send_response(200)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for delay in self.chunk_delays:
+                time.sleep(delay)
+                self.wfile.write(b"2\r\nok\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(header_delay=0.0, chunk_delays=()):
+        handler = type("Handler", (SlowHandler,), {
+            "header_delay": header_delay, "chunk_delays": chunk_delays
+        })
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        return f"http://127.0.0.1:{srv.server_address[1]}/"
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+
+
+def manager():
+    return UpstreamClientManager(first_byte_timeout=2.0, read_timeout=0.3)
+
+
+def read(clients, url):
+    async def main():
+        try:
+            async with clients.stream("POST", url, json={}) as response:
+                return b"".join([chunk async for chunk in response.aiter_bytes()])
+        finally:
+            await clients.aclose()
+    return asyncio.run(main())
+
+
+def test_slow_first_byte_uses_first_byte_timeout(server):
+    url = server(header_delay=0.6, chunk_delays=(0.1, 0.1))
+    assert read(manager(), url) == b"okok"
+
+
+def test_stalled_chunk_raises_read_timeout(server):
+    url = server(chunk_delays=(0.0, 1.0))
+    clients = manager()
+    with pytest.raises(httpx.ReadTimeout):
+        read(clients, url)
+    assert clients._metrics[origin_of(url)].timeouts == 1
+
+
+def test_steady_chunks_within_read_timeout(server):
+    url = server(chunk_delays=(0.2, 0.2, 0.2, 0.2))
+    assert read(manager(), url) == b"okokokok"
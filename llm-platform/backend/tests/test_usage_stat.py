@@ -0,0 +1,63 @@
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.usage_stat import usage_stat
+from app.db.database import Base
+from app.models.access_log import AccessLog
+from app.models.usage_stat import UsageStat
+
+
+def make_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def log(day, tokens):
+    return AccessLog(
+        user_id=1, api_key_id=1, model_id=1, request_type="chat", status_code=200,
+        latency_ms=10, total_tokens=tokens, created_at=datetime.combine(day, datetime.min.time())
+    )
+
+
+def rollups(db):
+    rows = db.execute(select(UsageStat.date, UsageStat.request_count, UsageStat.total_tokens))
+    return sorted(tuple(row) for row in rows)
+
+
+def test_rebuild_keeps_rollups_of_archived_days(tmp_path):
+    db = make_session(tmp_path)
+    # 2024-01-01 was archived: its logs are gone, only the rollup is left
+    db.add(UsageStat(user_id=1, model_id=1, date=date(2024, 1, 1), request_count=7, total_tokens=700))
+    # A stale rollup for a day that still has logs
+    db.add(UsageStat(user_id=1, model_id=1, date=date(2024, 1, 2), request_count=99, total_tokens=1))
+    db.add_all([log(date(2024, 1, 2), 10), log(date(2024, 1, 2), 20), log(date(2024, 1, 3), 5)])
+    db.commit()
+
+    assert usage_stat.rebuild(db) == 3
+    assert rollups(db) == [
+        (date(2024, 1, 1), 7, 700),
+        (date(2024, 1, 2), 2, 30),
+        (date(2024, 1, 3), 1, 5),
+    ]
+
+
+def test_rebuild_explicit_range(tmp_path):
+    db = make_session(tmp_path)
+    db.add_all([log(date(2024, 1, 2), 10), log(date(2024, 1, 3), 5)])
+    db.add(UsageStat(user_id=1, model_id=1, date=date(2024, 1, 3), request_count=1, total_tokens=1))
+    db.commit()
+
+    assert usage_stat.rebuild(db, start_date=date(2024, 1, 2), end_date=date(2024, 1, 2)) == 1
+    assert rollups(db) == [(date(2024, 1, 2), 1, 10), (date(2024, 1, 3), 1, 1)]
+
+
+def test_rebuild_without_logs_keeps_everything(tmp_path):
+    db = make_session(tmp_path)
+    db.add(UsageStat(user_id=1, model_id=1, date=date(2024, 1, 1), request_count=7, total_tokens=700))
+    db.commit()
+
+    assert usage_stat.rebuild(db) == 0
+    assert rollups(db) == [(date(2024, 1, 1), 7, 700)]